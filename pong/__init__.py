@@ -0,0 +1,7 @@
+# Pong engine
+#
+# The modules in this package hold the parts of Pong shared by the games, pong.sim
+# and pong.batch do not need pygame or a window.
+# pong.game draws a Match from pong.sim on screen, and python -m pong plays it.
+
+from pong.sim import Match, Ball, Paddle, HoldInput, ScriptedInput
@@ -0,0 +1,41 @@
+# Pong entry point
+#
+#    python -m pong [options]             play in a window, see python -m pong --help
+#    python -m pong --headless [options]  play a match between bots without pygame and
+#                                         print the result, see --headless --help
+#
+# The headless mode never imports pygame, so it starts no part of SDL at all.
+
+import argparse
+import sys
+import time
+
+# User-defined functions
+
+def headless(argv):
+   # play a match between two bots as fast as possible and print how it ended
+   started = time.perf_counter()
+   parser = argparse.ArgumentParser(prog='python -m pong --headless', \
+                                    description='Play Pong between bots without a window')
+   parser.add_argument('--ticks', type=int, default=36000, \
+                       help='ticks before the match is a draw, like in a tournament (default 36000)')
+   parser.add_argument('--left', default='intercept', help='bot playing the left paddle')
+   parser.add_argument('--right', default='follow', help='bot playing the right paddle')
+   parser.add_argument('--seed', type=int, default=0, help='seed for the serve')
+   options = parser.parse_args(argv)
+   from pong.tournament import play_game
+   result = play_game(0, options.left, options.right, options.seed, options.ticks)
+   print('%s %d - %d %s after %d ticks%s in %.3f s' % (result['left'], result['score_left'], \
+         result['score_right'], result['right'], result['ticks'], '' if result['finished'] else ' (draw)', \
+         time.perf_counter() - started))
+
+def main(argv=None):
+   argv = sys.argv[1:] if argv is None else list(argv)
+   if '--headless' in argv:
+      argv.remove('--headless')
+      return headless(argv)
+   from pong.game import main as play
+   return play(argv)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,134 @@
+# Pong computer players
+#
+# An InterceptBot moves its paddle to where the ball will cross the paddle's front.
+# Instead of simulating the ball forward every frame, it works out the crossing in
+# closed form: the bounces off the top and bottom walls are unfolded, so the ball
+# travels in a straight line through mirrored copies of the playfield, and the
+# crossing height is folded back into the real one. A ball moving away is taken to
+# come back off the other paddle, so the bot can get ready early. The answer only
+# changes when the ball velocity changes, which is at a wall or paddle bounce, so it is
+# cached until then.
+#
+# A FollowBot, which chases the height of the ball every tick, and a StillBot, which
+# never moves, are there to play against.
+#
+# BotInput turns one or two bots into an input source for pong.sim.Match, leaving a
+# paddle without a bot to the keyboard.
+
+# User-defined classes
+
+class InterceptBot:
+   # An object in this class moves a paddle to meet the ball
+
+   def __init__(self, speed=5):
+      # Initialize an InterceptBot.
+      # - speed is the int paddle velocity the bot moves with, like the keyboard
+      # - key is the ball velocity the cached target was worked out for
+      # - target is the height the paddle center is moved to
+      self.speed = speed
+      self.key = None
+      self.target = None
+      self.solves = 0
+
+   def stale(self, match):
+      # return True if the ball velocity changed since the target was worked out
+      return self.key != (match.ball.velocity[0], match.ball.velocity[1])
+
+   def intercept(self, match, paddle):
+      # Return the height where the ball center will cross the front of paddle. When the
+      # ball is moving away, it is taken to come back off the front of the other paddle,
+      # so the bounce off that paddle is unfolded too.
+      ball = match.ball
+      x, y = ball.center
+      velocity_x, velocity_y = ball.velocity
+      radius = ball.radius
+      if velocity_x == 0:
+         return match.window_height / 2
+      left_face = match.left_paddle.left + match.left_paddle.width + radius
+      right_face = match.right_paddle.left - radius
+      if paddle is match.left_paddle:
+         face_x, other_face_x, towards = left_face, right_face, velocity_x < 0
+      else:
+         face_x, other_face_x, towards = right_face, left_face, velocity_x > 0
+      if towards:
+         distance = abs(x - face_x)
+      else:
+         distance = abs(other_face_x - x) + abs(other_face_x - face_x)
+      time = distance / abs(velocity_x)
+      return fold(y + velocity_y * time, radius, match.window_height - radius)
+
+   def velocity(self, match, paddle):
+      # return the velocity that moves paddle towards the target
+      if self.stale(match):
+         self.key = (match.ball.velocity[0], match.ball.velocity[1])
+         self.target = self.intercept(match, paddle)
+         self.solves += 1
+      middle = paddle.top + paddle.height / 2
+      if middle < self.target - self.speed:
+         return self.speed
+      if middle > self.target + self.speed:
+         return -self.speed
+      return 0
+
+class FollowBot:
+   # An object in this class moves a paddle towards the height of the ball every tick
+
+   def __init__(self, speed=5):
+      self.speed = speed
+
+   def stale(self, match):
+      # the ball moves every tick, so the bot may change its mind every tick
+      return True
+
+   def velocity(self, match, paddle):
+      middle = paddle.top + paddle.height / 2
+      if middle < match.ball.center[1] - self.speed:
+         return self.speed
+      if middle > match.ball.center[1] + self.speed:
+         return -self.speed
+      return 0
+
+class StillBot:
+   # An object in this class never moves its paddle
+
+   def stale(self, match):
+      return False
+
+   def velocity(self, match, paddle):
+      return 0
+
+class BotInput:
+   # An input source where bots play one or both paddles
+
+   def __init__(self, left=None, right=None):
+      # - left and right are the bots of the paddles, None leaves a paddle at the
+      #   velocity it has, so it can be played with the keyboard
+      self.left = left
+      self.right = right
+
+   def velocities(self, match):
+      left_velocity, right_velocity = match.left_paddle.velocity, match.right_paddle.velocity
+      if self.left is not None:
+         left_velocity = self.left.velocity(match, match.left_paddle)
+      if self.right is not None:
+         right_velocity = self.right.velocity(match, match.right_paddle)
+      return (left_velocity, right_velocity)
+
+   def next_change(self, match):
+      # a bot only changes its mind after a bounce, or while its paddle is moving, which
+      # pong.sim.Match.fast_forward already steps tick by tick
+      for bot in (self.left, self.right):
+         if bot is not None and bot.stale(match):
+            return match.tick
+      return None
+
+# User-defined functions
+
+def fold(position, low, high):
+   # return where a point that moved to position in a straight line would be if it
+   # bounced between low and high instead
+   span = high - low
+   offset = (position - low) % (2 * span)
+   if offset > span:
+      offset = 2 * span - offset
+   return low + offset
@@ -0,0 +1,507 @@
+# Pong match analytics
+#
+# Statistics for game balance, such as how long rallies last, where the ball hits the
+# paddles, how often the server wins a rally and how often a player comes back from a
+# score, over as many simulated matches as it takes. The matches are played by
+# pong.batch.BatchMatch, thousands at a time, and the numbers are worked out as the
+# matches go, so a run of millions of rallies never holds more than one tick of
+# events and a little state for every match in play:
+#
+#    batch_events  plays the matches and makes an array of the events of every tick:
+#                  paddle hits, wall bounces, points and the start and end of a match
+#    rallies       follows every match through its events and makes an array of the
+#                  rallies and of the matches that ended in that tick
+#    MatchStats    adds them all up in fixed NumPy histograms with np.bincount
+#
+# Each stage is a generator that takes the one before it, so they can be joined up
+# differently or fed other events. match_events makes the same events from a
+# pong.sim.Match stepped one tick at a time, with any input source, which is slower but
+# checks the batch events against the real thing.
+#
+#    python -m pong.analytics --matches 20000
+#    python -m pong.analytics --matches 20000 --paddle-height 40 --ball-speed 11
+#
+# The events are found by comparing the state before and after a tick, the same way
+# for both engines: the ball velocity along y turns round at a wall bounce, the score
+# goes up at a point, and the velocity along x turns round at a paddle hit, or at the
+# left or right wall when a point is scored. A rally runs from the start of a match or
+# a point to the next point, and is served by the player whose wall the ball leaves.
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from pong.batch import BatchMatch
+from pong.replay import LEFT, RIGHT
+
+START, HIT, WALL, POINT, END = 0, 1, 2, 3, 4
+TOP, BOTTOM = 0, 1
+DRAW = -1
+WINNING_SCORE = 11
+# the score states from (0, 0) to (11, 11) a match goes through, one per point
+SCORES = (WINNING_SCORE + 1) ** 2
+MAX_POINTS = 2 * WINNING_SCORE
+
+# an event, side is the paddle, the wall, the player who scored or the server of a new
+# match, y is where the ball center was and offset is the ball center below the top of
+# the paddle it hit
+EVENT = np.dtype([('match', np.int32), ('tick', np.int64), ('kind', np.int8), ('side', np.int8), \
+                  ('y', np.int32), ('offset', np.int32)])
+RALLY = np.dtype([('match', np.int32), ('start', np.int64), ('ticks', np.int64), ('hits', np.int32), \
+                  ('walls', np.int32), ('server', np.int8), ('winner', np.int8), \
+                  ('score_left', np.int8), ('score_right', np.int8)])
+# a finished match, path holds the score states it went through
+FINISHED = np.dtype([('match', np.int32), ('ticks', np.int64), ('score_left', np.int8), \
+                     ('score_right', np.int8), ('winner', np.int8), ('points', np.int8), \
+                     ('path', np.int16, (MAX_POINTS + 1,))])
+SERVES = ((-9, 9), (-4, -3, -2, 2, 3, 4))
+POLICIES = ('follow', 'intercept', 'still')
+
+# User-defined classes
+
+class BatchBot:
+   # An object in this class plays one paddle in every match of a BatchMatch, like the
+   # bots of pong.ai
+
+   def __init__(self, policy, side, n, speed=5):
+      # Initialize a BatchBot.
+      # - policy is one of POLICIES: 'follow' chases the height of the ball like
+      #   pong.ai.FollowBot, 'intercept' moves to where the ball will cross the front of
+      #   its paddle like pong.ai.InterceptBot and 'still' never moves
+      # - side is LEFT or RIGHT, n is the number of matches and speed the paddle velocity
+      # - target is where every intercept bot is going, worked out again only when the
+      #   ball velocity is no longer key_x, key_y, like InterceptBot caches it
+      self.policy = policy
+      self.side = side
+      self.speed = speed
+      self.target = np.zeros(n)
+      self.key_x = np.zeros(n, dtype=np.int32)
+      self.key_y = np.zeros(n, dtype=np.int32)
+
+   def forget(self, mask):
+      # work out the target again in the matches where mask is True, which were restarted
+      self.key_x[mask] = 0
+
+   def intercept(self, batch, index):
+      # return the heights where the ball will cross the front of the paddle in the
+      # matches with the array of indices index, like InterceptBot.intercept
+      center_x, center_y = batch.center_x[index], batch.center_y[index]
+      velocity_x, velocity_y = batch.velocity_x[index], batch.velocity_y[index]
+      radius = batch.ball_radius
+      left_face = batch.left_paddle_left + batch.paddle_width + radius
+      right_face = batch.right_paddle_left - radius
+      if self.side == LEFT:
+         face, other_face, towards = left_face, right_face, velocity_x < 0
+      else:
+         face, other_face, towards = right_face, left_face, velocity_x > 0
+      distance = np.where(towards, np.abs(center_x - face), np.abs(other_face - center_x) + abs(other_face - face))
+      with np.errstate(divide='ignore', invalid='ignore'):
+         time = distance / np.abs(velocity_x)
+      # fold the straight line back between the top and bottom walls, like pong.ai.fold
+      low, high = radius, batch.window_height - radius
+      span = high - low
+      offset = (center_y + velocity_y * time - low) % (2 * span)
+      target = low + np.where(offset > span, 2 * span - offset, offset)
+      return np.where(velocity_x == 0, batch.window_height / 2, target)
+
+   def velocities(self, batch, error=0):
+      # Return the paddle velocity in every match of batch
+      # - error is how many pixels below the ball's height each bot aims
+      if self.policy == 'still':
+         return 0
+      if self.policy == 'follow':
+         target = batch.center_y
+      else:
+         stale = np.flatnonzero((batch.velocity_x != self.key_x) | (batch.velocity_y != self.key_y))
+         if len(stale):
+            self.target[stale] = self.intercept(batch, stale)
+            self.key_x[stale] = batch.velocity_x[stale]
+            self.key_y[stale] = batch.velocity_y[stale]
+         target = self.target
+      # the paddle middle against the target, doubled to stay in whole numbers
+      top = batch.left_top if self.side == LEFT else batch.right_top
+      middle = 2 * top + batch.paddle_height
+      target = target + error
+      speed = self.speed
+      return np.where(middle < 2 * (target - speed), speed, np.where(middle > 2 * (target + speed), -speed, 0))
+
+class MatchStats:
+   # An object in this class adds up the events, rallies and finished matches of a run
+
+   def __init__(self, paddle_height=50, window_height=400, hit_bins=10, y_bins=20, max_hits=40, \
+                tick_bin=30, tick_bins=60):
+      # Initialize a MatchStats.
+      # - paddle_height and window_height are the sizes of the matches analysed
+      # - hit_bins is the number of bins along a paddle for the hit positions, and
+      #   y_bins the number along the playfield
+      # - max_hits is the last bin of the rally length in hits, longer rallies go in it
+      # - tick_bin is the width in ticks of a bin of the rally length in ticks, and
+      #   tick_bins the number of those bins
+      self.paddle_height = paddle_height
+      self.window_height = window_height
+      self.hit_bins = hit_bins
+      self.y_bins = y_bins
+      self.max_hits = max_hits
+      self.tick_bin = tick_bin
+      self.tick_bins = tick_bins
+      self.hit_offsets = np.zeros((2, hit_bins), dtype=np.int64)
+      self.hit_heights = np.zeros((2, y_bins), dtype=np.int64)
+      self.walls = np.zeros(2, dtype=np.int64)
+      self.rally_hits = np.zeros(max_hits + 1, dtype=np.int64)
+      self.rally_ticks = np.zeros(tick_bins, dtype=np.int64)
+      self.serves = np.zeros((2, 2), dtype=np.int64)
+      self.aces = np.zeros(2, dtype=np.int64)
+      self.score_visits = np.zeros(SCORES, dtype=np.int64)
+      self.score_left_wins = np.zeros(SCORES, dtype=np.int64)
+      self.loser_points = np.zeros(WINNING_SCORE, dtype=np.int64)
+      self.matches = 0
+      self.draws = 0
+      self.rallies = 0
+      self.ticks = 0
+
+   def add(self, events, rallies, finished):
+      # add the events, rallies and finished matches of one tick
+      hits = events[events['kind'] == HIT]
+      if len(hits):
+         side = hits['side'].astype(np.int64)
+         offset = np.clip(hits['offset'], 0, self.paddle_height - 1) * self.hit_bins // self.paddle_height
+         self.hit_offsets += np.bincount(side * self.hit_bins + offset, \
+                                         minlength=2 * self.hit_bins).reshape(2, self.hit_bins)
+         height = np.clip(hits['y'], 0, self.window_height - 1) * self.y_bins // self.window_height
+         self.hit_heights += np.bincount(side * self.y_bins + height, \
+                                         minlength=2 * self.y_bins).reshape(2, self.y_bins)
+      walls = events['side'][events['kind'] == WALL]
+      if len(walls):
+         self.walls += np.bincount(walls, minlength=2)
+
+      if len(rallies):
+         self.rallies += len(rallies)
+         self.rally_hits += np.bincount(np.minimum(rallies['hits'], self.max_hits), minlength=self.max_hits + 1)
+         self.rally_ticks += np.bincount(np.minimum(rallies['ticks'] // self.tick_bin, self.tick_bins - 1), \
+                                         minlength=self.tick_bins)
+         server, winner = rallies['server'].astype(np.int64), rallies['winner'].astype(np.int64)
+         self.serves += np.bincount(server * 2 + winner, minlength=4).reshape(2, 2)
+         self.aces += np.bincount(server[rallies['hits'] == 0], minlength=2)
+
+      if len(finished):
+         self.matches += len(finished)
+         self.ticks += int(finished['ticks'].sum())
+         decided = finished[finished['winner'] != DRAW]
+         self.draws += len(finished) - len(decided)
+         # every score state a match went through, and whether the left player won it
+         points = decided['points'].astype(np.int64)
+         states = decided['path'][np.arange(MAX_POINTS + 1) < points[:, None]]
+         left_won = np.repeat(decided['winner'] == LEFT, points)
+         self.score_visits += np.bincount(states, minlength=SCORES)
+         self.score_left_wins += np.bincount(states[left_won], minlength=SCORES)
+         self.loser_points += np.bincount(np.minimum(decided['score_left'], decided['score_right']), \
+                                          minlength=WINNING_SCORE)
+
+   def consume(self, stream):
+      # add up every (events, rallies, finished) tuple of a stream and return self
+      for events, rallies, finished in stream:
+         self.add(events, rallies, finished)
+      return self
+
+   def win_chances(self):
+      # return an 11 x 11 array of the chance that the left player wins from each score,
+      # with rows for the left score and columns for the right score, nan where no match went
+      visits = self.score_visits.reshape(WINNING_SCORE + 1, WINNING_SCORE + 1)[:WINNING_SCORE, :WINNING_SCORE]
+      wins = self.score_left_wins.reshape(WINNING_SCORE + 1, WINNING_SCORE + 1)[:WINNING_SCORE, :WINNING_SCORE]
+      with np.errstate(invalid='ignore', divide='ignore'):
+         return wins / visits
+
+   def summary(self):
+      # return the statistics as lines of text
+      lines = ['%d matches (%d draws), %d rallies, %d ticks' % (self.matches, self.draws, self.rallies, self.ticks)]
+      if self.rallies:
+         hits = np.arange(self.max_hits + 1)
+         lines.append('rally length: %.2f hits on average, median %d, 90th percentile %d%s' % \
+                      ((self.rally_hits * hits).sum() / self.rallies, percentile(self.rally_hits, 0.5), \
+                       percentile(self.rally_hits, 0.9), ' (capped at %d)' % self.max_hits))
+         lines.append('rally time: median %.1f s, 90th percentile %.1f s' % \
+                      ((percentile(self.rally_ticks, 0.5) + 0.5) * self.tick_bin / 60, \
+                       (percentile(self.rally_ticks, 0.9) + 0.5) * self.tick_bin / 60))
+         served = self.serves.sum(axis=1)
+         for side, name in ((LEFT, 'left'), (RIGHT, 'right')):
+            if served[side]:
+               lines.append('%s serves: %d, won by the server %.1f%%, not returned %.1f%%' % (name, \
+                            served[side], 100 * self.serves[side, side] / served[side], \
+                            100 * self.aces[side] / served[side]))
+         lines.append('wall bounces: %.2f per rally' % (self.walls.sum() / self.rallies))
+      for side, name in ((LEFT, 'left'), (RIGHT, 'right')):
+         total = self.hit_offsets[side].sum()
+         if total:
+            lines.append('%-5s paddle hits from top to bottom (%%): %s' % (name, \
+                         ' '.join('%4.1f' % (100 * count / total) for count in self.hit_offsets[side])))
+      if self.matches > self.draws:
+         lines.append('points of the loser (%%): %s' % ' '.join('%d:%.1f' % (points, \
+                      100 * count / (self.matches - self.draws)) for points, count in \
+                      enumerate(self.loser_points) if count))
+         lines.append('chance the left player wins from each score (%), left score down, right across:')
+         lines.append('     ' + ''.join('%4d' % right for right in range(WINNING_SCORE)))
+         for left, row in enumerate(self.win_chances()):
+            lines.append('%4d ' % left + ''.join('   .' if np.isnan(chance) else '%4d' % round(100 * chance) \
+                                               for chance in row))
+      return lines
+
+
+# User-defined functions
+
+def percentile(histogram, fraction):
+   # return the bin of a histogram below which fraction of its counts are
+   cumulative = np.cumsum(histogram)
+   return int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+
+def make_events(kinds):
+   # Return an EVENT array from a sequence of (kind, side, match, tick, y, offset)
+   # tuples of arrays or numbers, one tuple per group of events of the same kind
+   sizes = [len(np.atleast_1d(group[2])) for group in kinds]
+   events = np.empty(sum(sizes), dtype=EVENT)
+   start = 0
+   for size, (kind, side, match, tick, y, offset) in zip(sizes, kinds):
+      part = events[start:start + size]
+      part['kind'] = kind
+      part['side'] = side
+      part['match'] = match
+      part['tick'] = tick
+      part['y'] = y
+      part['offset'] = offset
+      start += size
+   return events
+
+def serve(batch, mask, rng, ball_speed):
+   # start new matches where mask is True, with a serve picked at random like the
+   # serves of pong.tournament, from any height, with the x velocity scaled to ball_speed
+   batch.reset(mask)
+   count = int(np.count_nonzero(mask))
+   batch.velocity_x[mask] = rng.choice(SERVES[0], count) * ball_speed // 9
+   batch.velocity_y[mask] = rng.choice(SERVES[1], count)
+   radius = batch.ball_radius
+   batch.center_y[mask] = rng.integers(radius, batch.window_height - radius, count)
+
+def batch_events(matches, size=4096, left='intercept', right='intercept', speed=5, aim=30, \
+                 ball_speed=9, paddle_height=None, paddle_margin_wall=None, max_ticks=36000, seed=0, \
+                 batch=None):
+   # Play matches matches between two bot policies, size at a time, and yield an EVENT
+   # array for every tick. The match of an event is its place in the batch, which starts
+   # a new match once the one before it has ended
+   # - left and right are policies in POLICIES and speed is their paddle speed. Bots that
+   #   never miss never end a rally, so every time the ball turns each bot picks a new
+   #   aim up to aim pixels above or below the ball, and misses when that is more than
+   #   half a paddle out
+   # - ball_speed is the x velocity of a serve
+   # - a match that has not ended after max_ticks ticks is a draw
+   # - batch is a BatchMatch to play in, or None to make one, so the caller can see the
+   #   sizes of the paddles and playfield
+   rng = np.random.default_rng(seed)
+   if batch is None:
+      batch = BatchMatch(min(size, matches), paddle_height=paddle_height, paddle_margin_wall=paddle_margin_wall)
+   n = batch.n
+   slots = np.arange(n)
+   started = np.zeros(n, dtype=bool)
+   started[:matches] = True
+   serve(batch, started, rng, ball_speed)
+   batch.continue_game &= started
+   played = int(np.count_nonzero(started))
+   errors = np.zeros((2, n))
+   bots = (BatchBot(left, LEFT, n, speed), BatchBot(right, RIGHT, n, speed))
+   before = np.empty(n, dtype=bool)
+   velocity_x = np.empty(n, dtype=np.int32)
+   velocity_y = np.empty(n, dtype=np.int32)
+   score_left = np.empty(n, dtype=np.int32)
+   score_right = np.empty(n, dtype=np.int32)
+   yield make_events([(START, np.where(batch.velocity_x[started] > 0, LEFT, RIGHT), slots[started], 0, \
+                       batch.center_y[started], 0)])
+
+   while batch.continue_game.any():
+      for array, source in ((before, batch.continue_game), (velocity_x, batch.velocity_x), \
+                            (velocity_y, batch.velocity_y), (score_left, batch.score_left), \
+                            (score_right, batch.score_right)):
+         np.copyto(array, source)
+      batch.step(bots[LEFT].velocities(batch, errors[LEFT]), bots[RIGHT].velocities(batch, errors[RIGHT]))
+
+      scored_left = np.flatnonzero(batch.score_left > score_left)
+      scored_right = np.flatnonzero(batch.score_right > score_right)
+      turned = (batch.velocity_x != velocity_x) & before
+      if aim:
+         aiming = np.flatnonzero(turned)
+         errors[:, aiming] = rng.uniform(-aim, aim, (2, len(aiming)))
+      turned[scored_left] = False
+      turned[scored_right] = False
+      hit = np.flatnonzero(turned)
+      hit_side = np.where(batch.velocity_x[hit] > 0, LEFT, RIGHT)
+      hit_top = np.where(hit_side == LEFT, batch.left_top[hit], batch.right_top[hit])
+      wall = np.flatnonzero((batch.velocity_y != velocity_y) & before)
+      if max_ticks is not None:
+         batch.continue_game &= batch.tick < max_ticks
+      ended = np.flatnonzero(before & ~batch.continue_game)
+      winner = np.where(batch.score_left[ended] >= WINNING_SCORE, LEFT, \
+                        np.where(batch.score_right[ended] >= WINNING_SCORE, RIGHT, DRAW))
+      tick = batch.tick
+      yield make_events([(HIT, hit_side, hit, tick[hit], batch.center_y[hit], batch.center_y[hit] - hit_top), \
+                         (WALL, np.where(batch.velocity_y[wall] > 0, TOP, BOTTOM), wall, tick[wall], \
+                          batch.center_y[wall], 0), \
+                         (POINT, LEFT, scored_left, tick[scored_left], batch.center_y[scored_left], 0), \
+                         (POINT, RIGHT, scored_right, tick[scored_right], batch.center_y[scored_right], 0), \
+                         (END, winner, ended, tick[ended], 0, 0)])
+
+      if len(ended) and played < matches:
+         again = np.zeros(n, dtype=bool)
+         again[ended[:matches - played]] = True
+         played += int(np.count_nonzero(again))
+         serve(batch, again, rng, ball_speed)
+         for bot in bots:
+            bot.forget(again)
+         yield make_events([(START, np.where(batch.velocity_x[again] > 0, LEFT, RIGHT), slots[again], 0, \
+                             batch.center_y[again], 0)])
+
+def match_events(match, input_source=None, match_id=0, max_ticks=36000):
+   # Step a pong.sim.Match one tick at a time and yield an EVENT array for every tick
+   # with events, made the same way as those of batch_events
+   ball, left, right = match.ball, match.left_paddle, match.right_paddle
+   yield make_events([(START, LEFT if ball.velocity[0] > 0 else RIGHT, [match_id], match.tick, \
+                       ball.center[1], 0)])
+   while match.continue_game:
+      velocity_x, velocity_y = ball.velocity
+      score_left, score_right = match.score_left, match.score_right
+      match.step(input_source)
+      if max_ticks is not None and match.tick >= max_ticks:
+         match.continue_game = False
+      kinds = []
+      y = ball.center[1]
+      scored = match.score_left != score_left or match.score_right != score_right
+      if ball.velocity[0] != velocity_x and not scored:
+         side = LEFT if ball.velocity[0] > 0 else RIGHT
+         kinds.append((HIT, side, [match_id], match.tick, y, y - (left.top if side == LEFT else right.top)))
+      if ball.velocity[1] != velocity_y:
+         kinds.append((WALL, TOP if ball.velocity[1] > 0 else BOTTOM, [match_id], match.tick, y, 0))
+      if match.score_left != score_left:
+         kinds.append((POINT, LEFT, [match_id], match.tick, y, 0))
+      if match.score_right != score_right:
+         kinds.append((POINT, RIGHT, [match_id], match.tick, y, 0))
+      if not match.continue_game:
+         winner = LEFT if match.score_left >= WINNING_SCORE else \
+                  (RIGHT if match.score_right >= WINNING_SCORE else DRAW)
+         kinds.append((END, winner, [match_id], match.tick, 0, 0))
+      if kinds:
+         yield make_events(kinds)
+
+def rallies(stream):
+   # Follow every match through a stream of EVENT arrays, one per tick, and yield an
+   # (events, rallies, finished) tuple for each, where rallies is a RALLY array of the
+   # rallies that ended in the tick and finished a FINISHED array of the matches that did
+   state = {}
+
+   def grow(size):
+      # make room for the state of matches up to size
+      old = len(state.get('hits', ()))
+      if size <= old:
+         return
+      size = max(size, 2 * old)
+      for name, dtype, shape in (('hits', np.int32, ()), ('walls', np.int32, ()), ('start', np.int64, ()), \
+                                 ('server', np.int8, ()), ('score_left', np.int8, ()), \
+                                 ('score_right', np.int8, ()), ('points', np.int8, ()), \
+                                 ('path', np.int16, (MAX_POINTS + 1,))):
+         array = np.zeros((size,) + shape, dtype=dtype)
+         if old:
+            array[:old] = state[name]
+         state[name] = array
+
+   no_rallies = np.empty(0, dtype=RALLY)
+   no_finished = np.empty(0, dtype=FINISHED)
+   for events in stream:
+      if not len(events):
+         yield events, no_rallies, no_finished
+         continue
+      grow(int(events['match'].max()) + 1)
+      kind = events['kind']
+      hits, walls, start, server = state['hits'], state['walls'], state['start'], state['server']
+      score_left, score_right, points, path = state['score_left'], state['score_right'], \
+                                              state['points'], state['path']
+
+      new = events[kind == START]
+      if len(new):
+         ids = new['match']
+         hits[ids] = walls[ids] = 0
+         start[ids] = new['tick']
+         server[ids] = new['side']
+         score_left[ids] = score_right[ids] = 0
+         path[ids, 0] = 0
+         points[ids] = 1
+      np.add.at(hits, events['match'][kind == HIT], 1)
+      np.add.at(walls, events['match'][kind == WALL], 1)
+
+      scored = events[kind == POINT]
+      found = no_rallies
+      if len(scored):
+         ids = scored['match']
+         found = np.empty(len(scored), dtype=RALLY)
+         found['match'] = ids
+         found['start'] = start[ids]
+         found['ticks'] = scored['tick'] - start[ids]
+         found['hits'] = hits[ids]
+         found['walls'] = walls[ids]
+         found['server'] = server[ids]
+         found['winner'] = scored['side']
+         found['score_left'] = score_left[ids]
+         found['score_right'] = score_right[ids]
+         # the player who lost the point serves the next rally from their wall
+         score_left[ids] += scored['side'] == LEFT
+         score_right[ids] += scored['side'] == RIGHT
+         server[ids] = 1 - scored['side']
+         hits[ids] = walls[ids] = 0
+         start[ids] = scored['tick']
+         room = points[ids] <= MAX_POINTS
+         ids = ids[room]
+         path[ids, points[ids]] = np.minimum(score_left[ids], WINNING_SCORE).astype(np.int16) \
+                                  * (WINNING_SCORE + 1) + np.minimum(score_right[ids], WINNING_SCORE)
+         points[ids] += 1
+
+      ended = events[kind == END]
+      finished = no_finished
+      if len(ended):
+         ids = ended['match']
+         finished = np.empty(len(ended), dtype=FINISHED)
+         finished['match'] = ids
+         finished['ticks'] = ended['tick']
+         finished['score_left'] = score_left[ids]
+         finished['score_right'] = score_right[ids]
+         finished['winner'] = ended['side']
+         finished['points'] = points[ids]
+         finished['path'] = path[ids]
+      yield events, found, finished
+
+def main(argv=None):
+   # simulate matches between two bots and print their statistics
+   parser = argparse.ArgumentParser(description='Pong match statistics')
+   parser.add_argument('--matches', type=int, default=10000, help='matches to play')
+   parser.add_argument('--batch', type=int, default=4096, help='matches played at once')
+   parser.add_argument('--left', choices=POLICIES, default='intercept', help='bot of the left paddle')
+   parser.add_argument('--right', choices=POLICIES, default='intercept', help='bot of the right paddle')
+   parser.add_argument('--speed', type=int, default=5, help='paddle speed of the bots')
+   parser.add_argument('--aim', type=int, default=30, \
+                       help='most pixels a bot aims away from the ball, so it can miss (default 30)')
+   parser.add_argument('--ball-speed', type=int, default=9, help='x velocity of the ball (default 9)')
+   parser.add_argument('--paddle-height', type=int, help='paddle height (default that of pong.sim.Match)')
+   parser.add_argument('--margin', type=int, help='paddle_margin_wall (default that of pong.sim.Match)')
+   parser.add_argument('--max-ticks', type=int, default=36000, help='ticks before a match is a draw')
+   parser.add_argument('--seed', type=int, default=0)
+   options = parser.parse_args(argv)
+   batch = BatchMatch(min(options.batch, options.matches), paddle_height=options.paddle_height, \
+                      paddle_margin_wall=options.margin)
+   stats = MatchStats(batch.paddle_height, batch.window_height)
+   started = time.perf_counter()
+   stats.consume(rallies(batch_events(options.matches, left=options.left, right=options.right, \
+                                      speed=options.speed, aim=options.aim, \
+                                      ball_speed=options.ball_speed, max_ticks=options.max_ticks, \
+                                      seed=options.seed, batch=batch)))
+   seconds = time.perf_counter() - started
+   print('\n'.join(stats.summary()))
+   print('%.1f s, %d rallies per second' % (seconds, stats.rallies / seconds))
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,237 @@
+# Pong batch engine
+#
+# Steps many independent matches at once with NumPy. The state of every match is kept
+# in one array per field (ball centers, velocities, paddle tops, paddle velocities and
+# scores), and one call to step plays one tick of every match that is still going,
+# using the same rules as pong.sim.Match.update tick for tick. Finished matches are
+# masked out and keep their final state, like a Game that has stopped updating.
+#
+# A BallArray stores many balls the same way, one contiguous array per field instead of
+# one pong.sim.Ball object each, and moves them all with Ball.move's rules at once.
+
+import numpy as np
+
+from pong.sim import Ball, Match
+
+# User-defined classes
+
+class BatchMatch:
+   # An object in this class represents n matches of Pong played side by side
+
+   def __init__(self, n, window_width=500, window_height=400, x_velocity=9, y_velocity=3, \
+                paddle_height=None, paddle_margin_wall=None):
+      # Initialize a BatchMatch.
+      # - self is the BatchMatch to initialize
+      # - n is the int number of matches
+      # - paddle_height and paddle_margin_wall change the paddle height and its distance
+      #   from the left or right wall from those of a Match, to try other layouts
+      # - the other arguments are the same as for pong.sim.Match and are shared by
+      #   every match in the batch
+      # the sizes of the playfield, paddles and ball are taken from a Match so both
+      # engines always agree on them
+      template = Match(window_width, window_height, x_velocity, y_velocity)
+      resize(template, paddle_height, paddle_margin_wall)
+      self.n = n
+      self.window_width = window_width
+      self.window_height = window_height
+      self.ball_radius = template.ball_radius
+      self.paddle_width = template.paddle_width
+      self.paddle_height = template.paddle_height
+      self.left_paddle_left = template.left_paddle.left
+      self.right_paddle_left = template.right_paddle.left
+
+      # one int32 array per field, index i is the state of match i
+      self.center_x = np.empty(n, dtype=np.int32)
+      self.center_y = np.empty(n, dtype=np.int32)
+      self.velocity_x = np.empty(n, dtype=np.int32)
+      self.velocity_y = np.empty(n, dtype=np.int32)
+      self.left_top = np.empty(n, dtype=np.int32)
+      self.right_top = np.empty(n, dtype=np.int32)
+      self.left_velocity = np.zeros(n, dtype=np.int32)
+      self.right_velocity = np.zeros(n, dtype=np.int32)
+      self.score_left = np.zeros(n, dtype=np.int32)
+      self.score_right = np.zeros(n, dtype=np.int32)
+      self.tick = np.zeros(n, dtype=np.int64)
+      self.continue_game = np.ones(n, dtype=bool)
+
+      # scratch buffers reused by every step
+      self._active = np.empty(n, dtype=np.int32)
+      self._mask = np.empty(n, dtype=bool)
+      self._hit = np.empty(n, dtype=bool)
+      self._edge = np.empty(n, dtype=np.int32)
+
+      self.template = template
+      self.reset()
+
+   def reset(self, mask=None):
+      # start new matches, in every entry of the batch or where the bool array mask is True
+      template = self.template
+      where = slice(None) if mask is None else mask
+      self.center_x[where], self.center_y[where] = template.ball.center
+      self.velocity_x[where], self.velocity_y[where] = template.ball.velocity
+      self.left_top[where] = template.left_paddle.top
+      self.right_top[where] = template.right_paddle.top
+      self.left_velocity[where] = 0
+      self.right_velocity[where] = 0
+      self.score_left[where] = 0
+      self.score_right[where] = 0
+      self.tick[where] = 0
+      self.continue_game[where] = True
+
+   def load(self, index, match):
+      # copy the state of a pong.sim.Match into match index of the batch
+      self.center_x[index], self.center_y[index] = match.ball.center
+      self.velocity_x[index], self.velocity_y[index] = match.ball.velocity
+      self.left_top[index] = match.left_paddle.top
+      self.right_top[index] = match.right_paddle.top
+      self.left_velocity[index] = match.left_paddle.velocity
+      self.right_velocity[index] = match.right_paddle.velocity
+      self.score_left[index] = match.score_left
+      self.score_right[index] = match.score_right
+      self.tick[index] = match.tick
+      self.continue_game[index] = match.continue_game
+
+   def match(self, index):
+      # return a new pong.sim.Match with the state of match index of the batch
+      match = Match(self.window_width, self.window_height)
+      resize(match, self.paddle_height, self.template.paddle_margin_wall)
+      match.ball.place((int(self.center_x[index]), int(self.center_y[index])), \
+                       (int(self.velocity_x[index]), int(self.velocity_y[index])))
+      match.left_paddle.top = int(self.left_top[index])
+      match.right_paddle.top = int(self.right_top[index])
+      match.left_paddle.velocity = int(self.left_velocity[index])
+      match.right_paddle.velocity = int(self.right_velocity[index])
+      match.score_left = int(self.score_left[index])
+      match.score_right = int(self.score_right[index])
+      match.tick = int(self.tick[index])
+      match.continue_game = bool(self.continue_game[index])
+      return match
+
+   def set_paddle_velocities(self, left_velocity, right_velocity):
+      # Set the paddle velocities of every match that has not ended
+      # - left_velocity and right_velocity are ints or arrays of n ints, None keeps the
+      #   current velocities
+      if left_velocity is not None:
+         np.copyto(self.left_velocity, left_velocity, casting='unsafe', where=self.continue_game)
+      if right_velocity is not None:
+         np.copyto(self.right_velocity, right_velocity, casting='unsafe', where=self.continue_game)
+
+   def step(self, left_velocity=None, right_velocity=None):
+      # Play one tick of every match that has not ended, like Match.step
+      # - left_velocity and right_velocity are passed to set_paddle_velocities first
+      self.set_paddle_velocities(left_velocity, right_velocity)
+      active = self._active
+      mask = self._mask
+      hit = self._hit
+      edge = self._edge
+      radius = self.ball_radius
+      np.copyto(active, self.continue_game, casting='unsafe')
+
+      # move the balls and bounce them off the four walls
+      for center, velocity, size in ((self.center_x, self.velocity_x, self.window_width), \
+                                    (self.center_y, self.velocity_y, self.window_height)):
+         np.multiply(velocity, active, out=edge)
+         center += edge
+         np.less(center, radius, out=mask)
+         np.greater(center, size - radius, out=hit)
+         mask |= hit
+         mask &= self.continue_game
+         np.negative(velocity, out=velocity, where=mask)
+
+      # move the paddles and keep them on screen
+      bottom = self.window_height - self.paddle_height
+      for top, velocity in ((self.left_top, self.left_velocity), (self.right_top, self.right_velocity)):
+         np.multiply(velocity, active, out=edge)
+         top += edge
+         np.clip(top, 0, bottom, out=top)
+
+      # bounce the balls off the front of the paddles
+      mask[...] = False
+      for paddle_left, top, sign in ((self.left_paddle_left, self.left_top, -1), \
+                                    (self.right_paddle_left, self.right_top, 1)):
+         np.add(self.center_x, sign * radius, out=edge)
+         np.greater_equal(edge, paddle_left, out=hit)
+         hit &= edge < paddle_left + self.paddle_width
+         hit &= self.center_y >= top
+         np.subtract(self.center_y, top, out=edge)
+         hit &= edge < self.paddle_height
+         hit &= (self.velocity_x * sign) > 0
+         mask |= hit
+      mask &= self.continue_game
+      np.negative(self.velocity_x, out=self.velocity_x, where=mask)
+
+      # give points for the balls that hit the left or right wall
+      np.less(self.center_x, radius, out=mask)
+      mask &= self.continue_game
+      self.score_right += mask
+      np.greater(self.center_x, self.window_width - radius, out=mask)
+      mask &= self.continue_game
+      self.score_left += mask
+      self.tick += active
+      self.decide_continue()
+
+   def decide_continue(self):
+      # end every match where a player has reached 11 points
+      self.continue_game &= self.score_left < 11
+      self.continue_game &= self.score_right < 11
+
+   def run(self, ticks):
+      # step every match for ticks updates, or until all of them have ended
+      for _ in range(ticks):
+         if not self.continue_game.any():
+            break
+         self.step()
+      return self
+
+class BallArray:
+   # An object in this class represents n balls of the same radius stored side by side
+
+   def __init__(self, n, radius=6):
+      # Initialize a BallArray of n balls at the origin standing still
+      # - radius is the int pixel radius of every ball
+      # the arrays are owned by the BallArray and only ever changed in place
+      self.n = n
+      self.radius = radius
+      self.center_x = np.zeros(n, dtype=np.int32)
+      self.center_y = np.zeros(n, dtype=np.int32)
+      self.velocity_x = np.zeros(n, dtype=np.int32)
+      self.velocity_y = np.zeros(n, dtype=np.int32)
+      self._mask = np.empty(n, dtype=bool)
+      self._hit = np.empty(n, dtype=bool)
+
+   def load(self, index, ball):
+      # copy the center and velocity of a pong.sim.Ball into ball index
+      self.center_x[index], self.center_y[index] = ball.center
+      self.velocity_x[index], self.velocity_y[index] = ball.velocity
+
+   def ball(self, index):
+      # return a new pong.sim.Ball with the state of ball index
+      return Ball(self.radius, (int(self.center_x[index]), int(self.center_y[index])), \
+                  (int(self.velocity_x[index]), int(self.velocity_y[index])))
+
+   def move(self, window_width, window_height):
+      # move every ball by its velocity and bounce it off the four walls, like Ball.move
+      mask, hit = self._mask, self._hit
+      for center, velocity, size in ((self.center_x, self.velocity_x, window_width), \
+                                    (self.center_y, self.velocity_y, window_height)):
+         center += velocity
+         np.less(center, self.radius, out=mask)
+         np.greater(center, size - self.radius, out=hit)
+         mask |= hit
+         np.negative(velocity, out=velocity, where=mask)
+
+# User-defined functions
+
+def resize(match, paddle_height=None, paddle_margin_wall=None):
+   # Change the paddle height and the distance of the paddles from the left and right
+   # walls of a new pong.sim.Match, keeping the paddles centred, None keeps a size
+   if paddle_height is not None:
+      match.paddle_height = paddle_height
+      for paddle in (match.left_paddle, match.right_paddle):
+         paddle.height = paddle_height
+         paddle.top = match.window_height // 2 - paddle_height // 2
+   if paddle_margin_wall is not None:
+      match.paddle_margin_wall = paddle_margin_wall
+      match.left_paddle.left = paddle_margin_wall
+      match.right_paddle.left = match.window_width - match.paddle_width - paddle_margin_wall
+   return match
@@ -0,0 +1,272 @@
+# Pong benchmarks
+#
+# Measures how fast the simulation and the renderer run, headless under the SDL dummy
+# video driver, for fixed tick counts and seeds so runs can be compared:
+#
+#    python -m pong.bench --save-baseline bench_baseline.json
+#    python -m pong.bench --baseline bench_baseline.json
+#
+# Every benchmark reports one or more metrics. Rates (per second) are better when
+# higher, times and allocation sizes are better when lower. When a baseline file is
+# given, any metric that is worse than the baseline by more than the tolerance is
+# reported as a regression and the exit status is 1.
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from pong.sim import HoldInput, Match, ScriptedInput
+
+# User-defined functions
+
+def random_script(seed, ticks, change_chance=0.05):
+   # return a ScriptedInput script of random paddle velocity changes for ticks ticks
+   rng = random.Random(seed)
+   script = {}
+   for tick in range(ticks):
+      if rng.random() < change_chance:
+         script[tick] = (rng.choice((-5, 0, 5)), rng.choice((-5, 0, 5)))
+   return script
+
+def play_ticks(ticks, seed, fast_forward=False):
+   # play ticks updates of matches with random inputs, starting a new match when one ends
+   input_source = ScriptedInput(random_script(seed, ticks))
+   played = 0
+   while played < ticks:
+      match = Match()
+      match.tick = played
+      if fast_forward:
+         match.fast_forward(input_source, ticks - played)
+      else:
+         match.run(input_source, ticks - played)
+      played = match.tick
+
+def bench_update(options):
+   # ticks per second of Match.update through Match.run
+   start = time.perf_counter()
+   play_ticks(options.ticks, options.seed)
+   return {'ticks_per_sec': options.ticks / (time.perf_counter() - start)}
+
+def bench_fast_forward(options):
+   # ticks per second of Match.fast_forward with the same inputs as bench_update, and
+   # with both paddles standing still, where it can jump from bounce to bounce
+   start = time.perf_counter()
+   play_ticks(options.ticks, options.seed, fast_forward=True)
+   result = {'ticks_per_sec': options.ticks / (time.perf_counter() - start)}
+   start = time.perf_counter()
+   played = 0
+   while played < options.ticks:
+      played += Match().fast_forward(HoldInput(), options.ticks - played).tick
+   result['still_ticks_per_sec'] = options.ticks / (time.perf_counter() - start)
+   return result
+
+def bench_ball(options):
+   # calls per second of Ball.move and Ball.collision_paddle on their own
+   match = Match()
+   ball, left_paddle, right_paddle = match.ball, match.left_paddle, match.right_paddle
+   width, height = match.window_width, match.window_height
+   start = time.perf_counter()
+   for _ in range(options.ticks):
+      ball.move(width, height)
+   move_time = time.perf_counter() - start
+   start = time.perf_counter()
+   for _ in range(options.ticks):
+      ball.collision_paddle(left_paddle, right_paddle)
+   collision_time = time.perf_counter() - start
+   return {'move_per_sec': options.ticks / move_time, \
+           'collision_per_sec': options.ticks / collision_time}
+
+def bench_batch(options):
+   # match ticks per second of the NumPy batch engine
+   from pong.batch import BatchMatch
+   batch = BatchMatch(options.batch)
+   steps = max(options.ticks // options.batch, 10)
+   start = time.perf_counter()
+   for _ in range(steps):
+      batch.step()
+   return {'match_ticks_per_sec': options.batch * steps / (time.perf_counter() - start)}
+
+def bench_multiball(options):
+   # ticks per second of a MultiBallMatch with options.balls balls and ball collisions
+   from pong.multiball import MultiBallMatch
+   match = MultiBallMatch(options.balls, seed=options.seed)
+   steps = max(options.ticks // options.balls, 10)
+   start = time.perf_counter()
+   for _ in range(steps):
+      match.update()
+   seconds = time.perf_counter() - start
+   # balls bouncing off each other next to a wall must not be pushed out of the playfield
+   assert match.strays() == 0, '%d balls are stuck past a wall' % match.strays()
+   return {'ticks_per_sec': steps / seconds, 'pairs_checked': match.pairs_checked}
+
+def bench_rewind(options):
+   # snapshots recorded and rewinds made per second in a 10 second RewindBuffer
+   from pong.snapshot import RewindBuffer
+   match = Match()
+   rewind = RewindBuffer(match, seconds=10)
+   input_source = ScriptedInput(random_script(options.seed, options.ticks))
+   start = time.perf_counter()
+   while match.tick < options.ticks:
+      match.step(input_source)
+      if not match.continue_game:
+         match = Match()
+         match.tick = rewind.newest + 1
+      rewind.record(match)
+   record_time = time.perf_counter() - start
+   # rewinding a second at a time, as holding backspace does, must stop at the oldest
+   # tick that is still in the buffer rather than reach into slots written over
+   oldest = rewind.oldest()
+   rewinds = 0
+   start = time.perf_counter()
+   while match.tick > oldest:
+      rewind.rewind(match, 60)
+      rewinds += 1
+   rewind_time = time.perf_counter() - start
+   assert match.tick == oldest == rewind.oldest() and rewind.rewind(match, 60) == oldest, \
+          'rewinding stopped at tick %d, not %d' % (match.tick, oldest)
+   return {'records_per_sec': options.ticks / record_time, 'rewinds_per_sec': rewinds / rewind_time}
+
+def open_window(width=500, height=400):
+   # start pygame with the dummy video driver and return the display surface
+   os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+   import pygame
+   pygame.display.init()
+   pygame.font.init()
+   return pygame.display.set_mode((width, height))
+
+def draw_frames(game, frames, input_source):
+   # update and draw a Game for frames frames
+   for _ in range(frames):
+      game.match.step(input_source)
+      game.draw()
+
+def bench_draw(options, full_redraw=False):
+   # frames per second of Game.draw, and the largest memory allocated during one frame
+   from pong.game import Game
+   surface = open_window()
+   game = Game(surface, 500, 400, full_redraw=full_redraw)
+   input_source = ScriptedInput(random_script(options.seed, options.frames))
+   # warm up the caches so only the steady state is measured
+   draw_frames(game, 10, input_source)
+   start = time.perf_counter()
+   draw_frames(game, options.frames, input_source)
+   frames_per_sec = options.frames / (time.perf_counter() - start)
+
+   tracemalloc.start()
+   peak = 0
+   for _ in range(min(options.frames, 200)):
+      current = tracemalloc.get_traced_memory()[0]
+      tracemalloc.reset_peak()
+      draw_frames(game, 1, input_source)
+      peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+   tracemalloc.stop()
+   return {'frames_per_sec': frames_per_sec, 'alloc_peak_bytes_per_frame': peak}
+
+def bench_draw_full(options):
+   # the same as bench_draw with the whole window redrawn every frame
+   return bench_draw(options, full_redraw=True)
+
+def bench_startup(options):
+   # Seconds to import the games and to get from a new interpreter to the first drawn
+   # frame, and of a whole headless run of python -m pong, which never imports pygame.
+   # Importing a game must not open a window or start SDL, which is checked too.
+   imports = 'import time; start = time.perf_counter(); import %s; ' \
+             'seconds = time.perf_counter() - start; import pygame; ' \
+             'assert pygame.display.get_surface() is None and not pygame.get_init(); print(seconds)'
+   first_frame = 'import time; start = time.perf_counter(); import pong.bench as bench, pong.game; ' \
+                 'game = pong.game.Game(bench.open_window(), 500, 400); game.draw(); ' \
+                 'print(time.perf_counter() - start)'
+   environment = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+   root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+   result = {}
+   runs = [(name + '_import_sec', ['-c', imports % module]) for name, module in \
+           (('game', 'pong.game'), ('pong1', 'pong1'), ('pong2', 'pong2'), ('pong3', 'pong3'))]
+   runs += [('first_frame_sec', ['-c', first_frame]), \
+            ('headless_sec', ['-m', 'pong', '--headless', '--ticks', '600'])]
+   for name, arguments in runs:
+      start = time.perf_counter()
+      output = subprocess.run([sys.executable] + arguments, cwd=root, env=environment, \
+                              capture_output=True, text=True, check=True).stdout
+      result['process_' + name] = time.perf_counter() - start
+      if name != 'headless_sec':
+         result[name] = float(output.split()[-1])
+   return result
+
+BENCHMARKS = {
+   'update': bench_update,
+   'fast_forward': bench_fast_forward,
+   'ball': bench_ball,
+   'batch': bench_batch,
+   'multiball': bench_multiball,
+   'rewind': bench_rewind,
+   'draw': bench_draw,
+   'draw_full': bench_draw_full,
+   'startup': bench_startup,
+}
+
+def higher_is_better(metric):
+   # rates are better when higher, times and sizes when lower
+   return metric.endswith('_per_sec')
+
+def compare(results, baseline, tolerance):
+   # return a list of (benchmark, metric, value, baseline value) for every metric that
+   # is worse than the baseline by more than tolerance
+   regressions = []
+   for name, metrics in results.items():
+      for metric, value in metrics.items():
+         base = baseline.get(name, {}).get(metric)
+         if not base:
+            continue
+         if higher_is_better(metric):
+            worse = value < base * (1 - tolerance)
+         else:
+            worse = value > base * (1 + tolerance)
+         if worse:
+            regressions.append((name, metric, value, base))
+   return regressions
+
+def main(argv=None):
+   # run the benchmarks from the command line
+   parser = argparse.ArgumentParser(description='Pong benchmarks')
+   parser.add_argument('names', nargs='*', metavar='name', \
+                       help='benchmarks to run, all of them if none are given: ' + ', '.join(BENCHMARKS))
+   parser.add_argument('--ticks', type=int, default=200000, help='ticks simulated per benchmark')
+   parser.add_argument('--frames', type=int, default=2000, help='frames drawn per benchmark')
+   parser.add_argument('--batch', type=int, default=10000, help='matches in the batch benchmark')
+   parser.add_argument('--balls', type=int, default=2000, help='balls in the multiball benchmark')
+   parser.add_argument('--seed', type=int, default=0, help='seed for the random paddle inputs')
+   parser.add_argument('--baseline', help='JSON file of results to compare against')
+   parser.add_argument('--save-baseline', metavar='PATH', help='write the results to PATH')
+   parser.add_argument('--tolerance', type=float, default=0.1, \
+                       help='fraction a metric may be worse than the baseline (default 0.1)')
+   options = parser.parse_args(argv)
+   for name in options.names:
+      if name not in BENCHMARKS:
+         parser.error('unknown benchmark %r' % name)
+
+   results = {}
+   for name in options.names or BENCHMARKS:
+      results[name] = BENCHMARKS[name](options)
+      for metric, value in results[name].items():
+         print('%-14s %-28s %14.6g' % (name, metric, value))
+
+   if options.save_baseline:
+      with open(options.save_baseline, 'w') as file:
+         json.dump(results, file, indent=1, sort_keys=True)
+   if options.baseline:
+      with open(options.baseline) as file:
+         baseline = json.load(file)
+      regressions = compare(results, baseline, options.tolerance)
+      for name, metric, value, base in regressions:
+         print('REGRESSION %s %s: %.6g (baseline %.6g)' % (name, metric, value, base))
+      if regressions:
+         return 1
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
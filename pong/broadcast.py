@@ -0,0 +1,420 @@
+# Pong spectator broadcasts
+#
+# A Broadcaster streams a match to any number of spectators over local TCP sockets.
+# The game hands it the state of the match after every update with publish, and it
+# sends every spectator the same frames:
+#
+# - a keyframe is the whole state packed by pong.snapshot, STATE.size bytes
+# - a delta frame lists only the fields of that state that differ from the last
+#   keyframe, usually the tick, the ball and the paddles. The fields of a match that is
+#   not swept move by whole pixels, so they are sent as two byte differences from the
+#   keyframe, which makes a delta frame about 25 bytes instead of over 100
+#
+# A keyframe is sent every keyframe_interval ticks, and whenever a delta frame would be
+# as big as one. Because every delta is against the keyframe and not against the frame
+# before it, a spectator only needs the last keyframe and any one delta after it to
+# know the whole state, so frames can be left out without anything going wrong.
+#
+# Every frame is encoded once and the same bytes object is queued for every spectator,
+# so publish does not block and takes a few microseconds per spectator. Each spectator
+# has its own task that writes its queue to its socket. A spectator that reads too
+# slowly fills its socket, then its queue; when the queue reaches max_queue frames the
+# frames in it are thrown away and the spectator is sent the last keyframe again
+# before the next frame, so it skips ahead to the live state. A slow spectator only
+# ever costs its own queue, and never holds up the match or the other spectators.
+#
+#    python -m pong --bot both --broadcast 7778   a game that can be watched
+#    python -m pong.broadcast --watch 127.0.0.1:7778
+#    python -m pong.broadcast --viewers 300 --stalled 5   a lobby of local spectators
+#
+# Every frame is a FRAME header with the size of its payload, its kind and the number of
+# the keyframe it belongs to. A spectator is first sent a HELLO with the settings of the
+# match, packed like the header of a pong.snapshot save file.
+
+import argparse
+import asyncio
+import collections
+import socket
+import struct
+import threading
+import time
+
+from pong import snapshot
+from pong.sim import Match
+
+FRAME = struct.Struct('<HBI')
+HELLO, KEYFRAME, DELTA = 0, 1, 2
+MASK = struct.Struct('<I')
+# the struct format of every field of pong.snapshot.STATE
+FIELDS = 'qddddidiididiidII?'
+# set in the mask of a delta frame whose fields are packed as int16 differences
+SMALL = 1 << 31
+
+# User-defined classes
+
+class Subscriber:
+   # An object in this class is the queue of frames for one spectator
+
+   def __init__(self, writer, max_queue):
+      # Initialize a Subscriber.
+      # - writer is the asyncio.StreamWriter of the spectator's socket
+      # - max_queue is the most frames queued before they are dropped
+      # - synced is False when the spectator has to be sent the last keyframe before
+      #   any more delta frames
+      # - sent, dropped and resyncs count the frames written, the frames thrown away
+      #   and the times the spectator fell behind
+      self.writer = writer
+      self.max_queue = max_queue
+      self.queue = collections.deque()
+      self.ready = asyncio.Event()
+      self.synced = False
+      self.sent = 0
+      self.dropped = 0
+      self.resyncs = 0
+
+   def push(self, frame, is_keyframe, keyframe):
+      # queue frame, or throw the queue away and start again from keyframe if the
+      # spectator is too far behind
+      if len(self.queue) >= self.max_queue:
+         self.dropped += len(self.queue)
+         self.queue.clear()
+         self.synced = False
+         self.resyncs += 1
+      if not self.synced and not is_keyframe:
+         self.queue.append(keyframe)
+      self.synced = True
+      self.queue.append(frame)
+      self.ready.set()
+
+   async def write(self):
+      # write the queued frames to the socket for as long as it is open
+      queue, writer = self.queue, self.writer
+      while True:
+         await self.ready.wait()
+         self.ready.clear()
+         if not queue:
+            continue
+         frames = len(queue)
+         data = b''.join(queue)
+         queue.clear()
+         writer.write(data)
+         self.sent += frames
+         # waits only while the socket holds more than the high water mark
+         await writer.drain()
+
+class Broadcaster:
+   # An object in this class sends the state of a match to spectators
+
+   def __init__(self, match, keyframe_interval=60, max_queue=60, high_water=4096, send_buffer=8192):
+      # Initialize a Broadcaster.
+      # - match is the pong.sim.Match that is broadcast, for its settings
+      # - keyframe_interval is the most ticks between keyframes
+      # - max_queue is the most frames queued for a spectator before it skips ahead
+      # - high_water is the most bytes held for a spectator's socket before its frames
+      #   queue up instead
+      # - send_buffer is the size of the kernel send buffer of a spectator's socket, kept
+      #   small so the frames of a slow spectator wait in its queue, where they can be
+      #   dropped, and not in the kernel, where they go stale
+      # - keyframe is the last keyframe with its FRAME header, sent to every new spectator
+      # - frames, keyframes and frame_bytes count what was encoded
+      self.hello = _frame(HELLO, 0, snapshot.SAVE_HEADER.pack(snapshot.SAVE_MAGIC, snapshot.SAVE_VERSION, \
+                          match.window_width, match.window_height, match.swept, match.time_step))
+      self.keyframe_interval = keyframe_interval
+      self.max_queue = max_queue
+      self.high_water = high_water
+      self.send_buffer = send_buffer
+      self.subscribers = set()
+      self.key_values = None
+      self.key_number = 0
+      self.keyframe = None
+      self.since_keyframe = 0
+      self.masks = {}
+      self.frames = 0
+      self.keyframes = 0
+      self.frame_bytes = 0
+      self.server = None
+      self.loop = None
+
+   async def start(self, host='127.0.0.1', port=0):
+      # listen for spectators on host and port and return the port
+      self.loop = asyncio.get_running_loop()
+      self.server = await asyncio.start_server(self.serve, host, port)
+      return self.server.sockets[0].getsockname()[1]
+
+   async def stop(self):
+      # stop listening, disconnect every spectator and wait until they are gone
+      self.server.close()
+      for subscriber in list(self.subscribers):
+         subscriber.writer.close()
+      while self.subscribers:
+         await asyncio.sleep(0.01)
+
+   def publish(self, match):
+      # Send the state of match to every spectator. This can be called from the thread of
+      # the event loop or from another one, such as the thread of a pygame game loop
+      state = snapshot.pack(match)
+      try:
+         running = asyncio.get_running_loop()
+      except RuntimeError:
+         running = None
+      if running is self.loop:
+         self.publish_state(state)
+      else:
+         self.loop.call_soon_threadsafe(self.publish_state, state)
+
+   def publish_state(self, state):
+      # encode state, a snapshot packed by pong.snapshot.pack, and queue it for every spectator
+      frame, is_keyframe = self.encode(state)
+      for subscriber in self.subscribers:
+         subscriber.push(frame, is_keyframe, self.keyframe)
+
+   def encode(self, state):
+      # Return the frame for state and True if it is a keyframe
+      # - the frame is a delta against the last keyframe unless it is time for a keyframe
+      #   or the delta would not be any smaller
+      values = snapshot.STATE.unpack(state)
+      self.frames += 1
+      if self.key_values is not None and self.since_keyframe < self.keyframe_interval:
+         changed = [index for index, (value, key_value) in enumerate(zip(values, self.key_values)) \
+                    if value != key_value]
+         mask = 0
+         for index in changed:
+            mask |= 1 << index
+         differences = [int(values[index] - self.key_values[index]) for index in changed]
+         if all(-32768 <= difference < 32768 and self.key_values[index] + difference == values[index] \
+                for index, difference in zip(changed, differences)):
+            mask |= SMALL
+            fields = differences
+         else:
+            fields = [values[index] for index in changed]
+         layout = self.masks.get(mask)
+         if layout is None:
+            layout = struct.Struct('<' + ('h' * len(changed) if mask & SMALL else \
+                                          ''.join(FIELDS[index] for index in changed)))
+            self.masks[mask] = layout
+         if MASK.size + layout.size < len(state):
+            self.since_keyframe += 1
+            frame = _frame(DELTA, self.key_number, MASK.pack(mask) + layout.pack(*fields))
+            self.frame_bytes += len(frame)
+            return frame, False
+      self.key_values = values
+      self.key_number += 1
+      self.since_keyframe = 1
+      self.keyframe = _frame(KEYFRAME, self.key_number, state)
+      self.keyframes += 1
+      self.frame_bytes += len(self.keyframe)
+      return self.keyframe, True
+
+   async def serve(self, reader, writer):
+      # send the match to a spectator that connected, until it disconnects
+      writer.transport.set_write_buffer_limits(high=self.high_water)
+      writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+      writer.write(self.hello)
+      subscriber = Subscriber(writer, self.max_queue)
+      if self.keyframe is not None:
+         subscriber.push(self.keyframe, True, self.keyframe)
+      self.subscribers.add(subscriber)
+      writing = asyncio.ensure_future(subscriber.write())
+      try:
+         # spectators send nothing, reading only finds out when they leave
+         while await reader.read(1024):
+            pass
+      except ConnectionError:
+         pass
+      finally:
+         self.subscribers.discard(subscriber)
+         writing.cancel()
+         writer.close()
+
+   def stats(self):
+      # return a dict with how much was encoded, sent and dropped
+      subscribers = list(self.subscribers)
+      return {'spectators': len(subscribers), 'frames': self.frames, 'keyframes': self.keyframes, \
+              'bytes_per_frame': self.frame_bytes / max(1, self.frames), \
+              'keyframe_bytes': FRAME.size + snapshot.STATE.size, \
+              'sent': sum(subscriber.sent for subscriber in subscribers), \
+              'dropped': sum(subscriber.dropped for subscriber in subscribers), \
+              'resyncs': sum(subscriber.resyncs for subscriber in subscribers)}
+
+class Spectator:
+   # An object in this class rebuilds a broadcast match from its frames
+
+   def __init__(self):
+      # Initialize a Spectator.
+      # - match is the pong.sim.Match being watched, None until the HELLO arrives
+      # - key_number and key_values are the number and the fields of the last keyframe
+      # - frames counts the frames shown and skipped the delta frames of a keyframe
+      #   that never arrived
+      self.match = None
+      self.key_number = None
+      self.key_values = None
+      self.masks = {}
+      self.frames = 0
+      self.skipped = 0
+
+   def feed(self, kind, number, payload):
+      # Apply one frame to the match, return True if the match changed
+      if kind == HELLO:
+         magic, version, window_width, window_height, swept, time_step = snapshot.SAVE_HEADER.unpack(payload)
+         if magic != snapshot.SAVE_MAGIC or version != snapshot.SAVE_VERSION:
+            raise ValueError('not a Pong broadcast')
+         self.match = Match(window_width, window_height, swept=bool(swept), time_step=time_step)
+         return False
+      if kind == KEYFRAME:
+         self.key_number = number
+         self.key_values = snapshot.STATE.unpack(payload)
+         snapshot.restore(self.match, payload)
+      elif number != self.key_number:
+         self.skipped += 1
+         return False
+      else:
+         mask = MASK.unpack_from(payload)[0]
+         layout = self.masks.get(mask)
+         if layout is None:
+            changed = [index for index in range(len(FIELDS)) if mask >> index & 1]
+            layout = (changed, struct.Struct('<' + ('h' * len(changed) if mask & SMALL else \
+                                                     ''.join(FIELDS[index] for index in changed))))
+            self.masks[mask] = layout
+         values = list(self.key_values)
+         key_values = self.key_values if mask & SMALL else None
+         for index, value in zip(layout[0], layout[1].unpack_from(payload, MASK.size)):
+            values[index] = key_values[index] + value if key_values is not None else value
+         snapshot.restore(self.match, snapshot.STATE.pack(*values))
+      self.frames += 1
+      return True
+
+   async def watch(self, reader, show=None, delay=0.0):
+      # Read frames from reader until the broadcast ends
+      # - show is called with the match after every frame, or None
+      # - delay is the seconds to wait between frames, to play a slow spectator
+      try:
+         while True:
+            header = await reader.readexactly(FRAME.size)
+            size, kind, number = FRAME.unpack(header)
+            if self.feed(kind, number, await reader.readexactly(size)) and show is not None:
+               show(self.match)
+            if delay:
+               await asyncio.sleep(delay)
+      except (asyncio.IncompleteReadError, ConnectionError):
+         return self
+
+# User-defined functions
+
+def _frame(kind, number, payload):
+   # return payload with its FRAME header
+   return FRAME.pack(len(payload), kind, number) + payload
+
+async def start_broadcaster(match, host='127.0.0.1', port=0, **options):
+   # start a Broadcaster for match on host and port and return it, options go to Broadcaster
+   broadcaster = Broadcaster(match, **options)
+   await broadcaster.start(host, port)
+   return broadcaster
+
+def start_broadcaster_thread(match, host='127.0.0.1', port=0, **options):
+   # run a Broadcaster in an asyncio loop on another thread, for a game loop that is not
+   # asyncio, and return it once it is listening
+   started = threading.Event()
+   holder = []
+
+   def serve():
+      async def listen():
+         holder.append(await start_broadcaster(match, host, port, **options))
+         started.set()
+         await asyncio.Event().wait()
+      asyncio.run(listen())
+
+   threading.Thread(target=serve, daemon=True).start()
+   started.wait()
+   return holder[0]
+
+async def connect(host, port, receive_buffer=None):
+   # Open a connection to a broadcast and return its reader and writer
+   # - receive_buffer is the most bytes the spectator holds before it stops reading the
+   #   socket, or None for the asyncio defaults
+   if receive_buffer is None:
+      return await asyncio.open_connection(host, port)
+   sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+   sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+   sock.setblocking(False)
+   await asyncio.get_running_loop().sock_connect(sock, (host, port))
+   return await asyncio.open_connection(sock=sock, limit=receive_buffer)
+
+async def lobby(viewers=300, stalled=5, ticks=600, tick_rate=60, **options):
+   # Broadcast a match between two bots to viewers local spectators, stalled of which
+   # hardly read, and return the broadcaster statistics, the match, the spectators and
+   # the times publish took
+   from pong.ai import BotInput, InterceptBot
+   match = Match()
+   bots = BotInput(InterceptBot(), InterceptBot())
+   broadcaster = await start_broadcaster(match, **options)
+   port = broadcaster.server.sockets[0].getsockname()[1]
+   spectators = [Spectator() for _ in range(viewers)]
+   watching = []
+   for number, spectator in enumerate(spectators):
+      slow = number < stalled
+      reader, writer = await connect('127.0.0.1', port, 1024 if slow else None)
+      # a stalled spectator takes a second over every frame until the match is over
+      watching.append((asyncio.ensure_future(spectator.watch(reader, delay=1.0 if slow else 0.0)), writer))
+
+   publish_times = []
+   loop = asyncio.get_running_loop()
+   next_time = loop.time()
+   for _ in range(ticks):
+      velocities = bots.velocities(match)
+      match.set_paddle_velocities(velocities[0], velocities[1])
+      match.update()
+      match.decide_continue()
+      started = time.perf_counter()
+      broadcaster.publish(match)
+      publish_times.append(time.perf_counter() - started)
+      next_time += 1 / tick_rate
+      await asyncio.sleep(max(0.0, next_time - loop.time()))
+   # give the spectators that keep up time to read the last frames
+   await asyncio.sleep(0.2)
+   stats = broadcaster.stats()
+   for task, writer in watching:
+      task.cancel()
+      writer.close()
+   await broadcaster.stop()
+   return stats, match, spectators, publish_times
+
+def main(argv=None):
+   # watch a broadcast, or broadcast a bot match to a lobby of local spectators
+   parser = argparse.ArgumentParser(description='Pong spectator broadcasts')
+   parser.add_argument('--watch', metavar='HOST:PORT', help='print the score of the broadcast at HOST:PORT')
+   parser.add_argument('--viewers', type=int, default=300, help='local spectators in the lobby')
+   parser.add_argument('--stalled', type=int, default=5, help='spectators in the lobby that hardly read')
+   parser.add_argument('--ticks', type=int, default=600, help='ticks the lobby match is played for')
+   parser.add_argument('--keyframe-interval', type=int, default=60, help='most ticks between keyframes')
+   options = parser.parse_args(argv)
+   if options.watch:
+      host, port = options.watch.rsplit(':', 1)
+
+      def show(match, shown=[None]):
+         score = (match.score_left, match.score_right)
+         if score != shown[0]:
+            shown[0] = score
+            print('tick %d score %d-%d' % (match.tick, score[0], score[1]), flush=True)
+
+      async def watch():
+         reader, writer = await connect(host, int(port))
+         await Spectator().watch(reader, show)
+         writer.close()
+      asyncio.run(watch())
+      return
+
+   stats, match, spectators, publish_times = asyncio.run(lobby(options.viewers, options.stalled, options.ticks, \
+                                                            keyframe_interval=options.keyframe_interval))
+   live = snapshot.pack(match)
+   in_sync = sum(spectator.match is not None and snapshot.pack(spectator.match) == live \
+                 for spectator in spectators)
+   print('%d spectators, %d in sync with tick %d' % (stats['spectators'], in_sync, match.tick))
+   print('%d frames, %d keyframes, %.1f bytes per frame (a keyframe is %d)' % (stats['frames'], \
+         stats['keyframes'], stats['bytes_per_frame'], stats['keyframe_bytes']))
+   print('%d frames sent, %d dropped for slow spectators, %d resyncs' % (stats['sent'], \
+         stats['dropped'], stats['resyncs']))
+   print('publish %.3f ms on average, %.3f ms at most' % (1000 * sum(publish_times) / len(publish_times), \
+         1000 * max(publish_times)))
+
+if __name__ == '__main__':
+   main()
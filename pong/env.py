@@ -0,0 +1,230 @@
+# Pong training environments
+#
+# A reinforcement learning interface to the rules of pong3.py, in the style of a
+# gymnasium vector environment. PongVecEnv plays n matches with the NumPy batch engine;
+# reset and step write the observations, rewards and done flags of all of them into
+# arrays made once, so stepping allocates nothing per match. A match that ends is started
+# again by the same step, as gymnasium and Stable-Baselines3 do, and its last observation
+# is kept in info['final_observation'] with the mask of the matches that ended in
+# info['_final_observation'].
+#
+# SubprocVecEnv splits the matches over worker processes. The observation, reward,
+# done and action arrays live in shared memory, so the workers write their part in
+# place and the learner reads the arrays directly without copying or pickling them.
+#
+# Observations are float32 rows of (ball x, ball y, ball x velocity, ball y velocity,
+# left paddle top, right paddle top, left velocity, right velocity), positions scaled
+# to 0..1 by the playfield size and velocities by 10. Actions are 0 to stay, 1 to move
+# up and 2 to move down. The reward is +1 when the left player scores and -1 when the
+# right player scores.
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pong.batch import BatchMatch
+
+OBSERVATION_SIZE = 8
+STAY, UP, DOWN = 0, 1, 2
+
+# User-defined classes
+
+class PongVecEnv:
+   # An object in this class is n Pong environments stepped together
+
+   def __init__(self, n, opponent=True, max_ticks=10000, paddle_speed=5, buffers=None):
+      # Initialize a PongVecEnv.
+      # - n is the int number of environments
+      # - opponent is True for a built in player that follows the ball on the right
+      #   paddle, so actions are for the left paddle only. If it is False, actions are
+      #   an (n, 2) array with the actions of the left and right paddles
+      # - max_ticks is the number of ticks after which a match is cut short
+      # - paddle_speed is the velocity of a paddle that moves
+      # - buffers is a dict of preallocated 'observations', 'final_observations',
+      #   'rewards', 'terminated', 'truncated' and 'actions' arrays to use, such as
+      #   arrays in shared memory
+      self.n = n
+      self.opponent = opponent
+      self.max_ticks = max_ticks
+      self.paddle_speed = paddle_speed
+      self.batch = BatchMatch(n)
+      buffers = buffers if buffers is not None else allocate(n, opponent)
+      self.observations = buffers['observations']
+      self.final_observations = buffers['final_observations']
+      self.rewards = buffers['rewards']
+      self.terminated = buffers['terminated']
+      self.truncated = buffers['truncated']
+      self.actions = buffers['actions']
+
+      # the velocity for each action, and scratch buffers reused by every step
+      self.action_velocity = np.array([0, -paddle_speed, paddle_speed], dtype=np.int32)
+      self._velocity = np.empty(n, dtype=np.int32)
+      self._scores = np.empty(n, dtype=np.int32)
+      self._done = np.empty(n, dtype=bool)
+      self.info = {'final_observation': self.final_observations, '_final_observation': self._done}
+
+   def observe(self):
+      # write the observations of every environment into self.observations
+      batch, observations = self.batch, self.observations
+      width, height = batch.window_width, batch.window_height
+      columns = ((batch.center_x, width), (batch.center_y, height), (batch.velocity_x, 10), \
+                 (batch.velocity_y, 10), (batch.left_top, height), (batch.right_top, height), \
+                 (batch.left_velocity, 10), (batch.right_velocity, 10))
+      for column, (values, scale) in enumerate(columns):
+         np.multiply(values, 1 / scale, out=observations[:, column], casting='unsafe')
+
+   def reset(self):
+      # start new matches in every environment and return the observations
+      self.batch.reset()
+      self.rewards[...] = 0
+      self.terminated[...] = False
+      self.truncated[...] = False
+      self.observe()
+      return self.observations
+
+   def follow_ball(self):
+      # return the right paddle velocities of the built in player
+      batch, velocity = self.batch, self._velocity
+      middle = batch.right_top + batch.paddle_height // 2
+      np.subtract(batch.center_y, middle, out=velocity)
+      np.clip(velocity, -self.paddle_speed, self.paddle_speed, out=velocity)
+      velocity[np.abs(velocity) < self.paddle_speed] = 0
+      return velocity
+
+   def step(self, actions=None):
+      # Play one tick of every environment.
+      # - actions is an array of actions, or None to use the ones already written into
+      #   self.actions
+      # - returns the (observations, rewards, terminated, truncated, info) of gymnasium,
+      #   environments that finished are started again and their observation is of the
+      #   new match. Their last observation is in the rows of info['final_observation']
+      #   where info['_final_observation'] is True, the other rows are left over from
+      #   earlier steps
+      batch = self.batch
+      if actions is not None:
+         self.actions[...] = actions
+      if self.opponent:
+         batch.set_paddle_velocities(self.action_velocity[self.actions], self.follow_ball())
+      else:
+         batch.set_paddle_velocities(self.action_velocity[self.actions[:, 0]], \
+                                     self.action_velocity[self.actions[:, 1]])
+      np.subtract(batch.score_left, batch.score_right, out=self._scores)
+      batch.step()
+      np.subtract(batch.score_left, batch.score_right, out=self.rewards, casting='unsafe')
+      self.rewards -= self._scores
+
+      np.logical_not(batch.continue_game, out=self.terminated)
+      np.greater_equal(batch.tick, self.max_ticks, out=self.truncated)
+      self.truncated &= batch.continue_game
+      np.logical_or(self.terminated, self.truncated, out=self._done)
+      self.observe()
+      if self._done.any():
+         # keep the last observation of the matches that ended before starting them again
+         np.copyto(self.final_observations, self.observations, where=self._done[:, None])
+         batch.reset(self._done)
+         self.observe()
+      return self.observations, self.rewards, self.terminated, self.truncated, self.info
+
+class SubprocVecEnv:
+   # An object in this class steps PongVecEnvs in worker processes over shared memory
+
+   def __init__(self, n, workers=2, opponent=True, max_ticks=10000):
+      # Initialize a SubprocVecEnv and start its workers.
+      # - n is the int number of environments, split as evenly as possible over workers
+      # - opponent and max_ticks are passed to every PongVecEnv
+      self.n = n
+      self.opponent = opponent
+      shapes = buffer_shapes(n, opponent)
+      self.memory = {name: shared_memory.SharedMemory(create=True, size=max(1, \
+                     int(np.prod(shape)) * np.dtype(dtype).itemsize)) \
+                     for name, (shape, dtype) in shapes.items()}
+      buffers = {name: np.ndarray(shape, dtype, buffer=self.memory[name].buf) \
+                 for name, (shape, dtype) in shapes.items()}
+      self.observations = buffers['observations']
+      self.final_observations = buffers['final_observations']
+      self.rewards = buffers['rewards']
+      self.terminated = buffers['terminated']
+      self.truncated = buffers['truncated']
+      self.actions = buffers['actions']
+      self._done = np.empty(n, dtype=bool)
+      self.info = {'final_observation': self.final_observations, '_final_observation': self._done}
+
+      self.connections = []
+      self.processes = []
+      bounds = np.linspace(0, n, workers + 1).astype(int)
+      for start, end in zip(bounds[:-1], bounds[1:]):
+         parent, child = multiprocessing.Pipe()
+         names = {name: memory.name for name, memory in self.memory.items()}
+         process = multiprocessing.Process(target=worker_main, daemon=True, \
+                   args=(child, names, n, int(start), int(end), opponent, max_ticks))
+         process.start()
+         self.connections.append(parent)
+         self.processes.append(process)
+
+   def call(self, command):
+      # send a command to every worker and wait until they have all done it
+      for connection in self.connections:
+         connection.send(command)
+      for connection in self.connections:
+         connection.recv()
+
+   def reset(self):
+      self.call('reset')
+      return self.observations
+
+   def step(self, actions=None):
+      # like PongVecEnv.step, the returned arrays are views of the shared memory that
+      # are written again by the next step
+      if actions is not None:
+         self.actions[...] = actions
+      self.call('step')
+      np.logical_or(self.terminated, self.truncated, out=self._done)
+      return self.observations, self.rewards, self.terminated, self.truncated, self.info
+
+   def close(self):
+      # stop the workers and free the shared memory
+      self.call('close')
+      for process in self.processes:
+         process.join()
+      self.observations = self.final_observations = self.rewards = self.terminated = \
+         self.truncated = self.actions = self.info = None
+      for memory in self.memory.values():
+         memory.close()
+         memory.unlink()
+
+# User-defined functions
+
+def buffer_shapes(n, opponent=True):
+   # return a dict from buffer name to the (shape, dtype) of the buffers of n environments
+   return {'observations': ((n, OBSERVATION_SIZE), np.float32), \
+           'final_observations': ((n, OBSERVATION_SIZE), np.float32), \
+           'rewards': ((n,), np.float32), \
+           'terminated': ((n,), np.bool_), \
+           'truncated': ((n,), np.bool_), \
+           'actions': ((n,) if opponent else (n, 2), np.int64)}
+
+def allocate(n, opponent=True):
+   # return a dict of new zeroed buffers for n environments
+   return {name: np.zeros(shape, dtype) for name, (shape, dtype) in buffer_shapes(n, opponent).items()}
+
+def worker_main(connection, names, n, start, end, opponent, max_ticks):
+   # Step the environments start to end of the shared buffers when asked on connection
+   memory = [shared_memory.SharedMemory(name=name) for name in names.values()]
+   shapes = buffer_shapes(n, opponent)
+   buffers = {name: np.ndarray(shapes[name][0], shapes[name][1], buffer=block.buf)[start:end] \
+              for name, block in zip(names, memory)}
+   env = PongVecEnv(end - start, opponent, max_ticks, buffers=buffers)
+   while True:
+      command = connection.recv()
+      if command == 'step':
+         env.step()
+      elif command == 'reset':
+         env.reset()
+      elif command == 'close':
+         break
+      connection.send(True)
+   env = buffers = None
+   for block in memory:
+      block.close()
+   connection.send(True)
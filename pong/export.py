@@ -0,0 +1,222 @@
+# Pong offline rendering
+#
+# Renders a recorded match, or a tournament game between two bots, to an image sequence
+# or to one raw video file, without a window and as fast as the machine allows. The
+# match is played again by the simulation and drawn by pong.game.Game on an offscreen
+# surface, one frame per tick, so the frames look exactly like the game.
+#
+#    python -m pong.export match.rec --output frames          frames/000000.png ...
+#    python -m pong.export match.rec --output match.raw       one raw video file
+#    python -m pong.export --bots intercept follow --seed 3 --output reel.raw --start 600
+#
+# The frames are split into chunks that are rendered in a pool of worker processes.
+# Before the pool starts, the match is played through once with
+# pong.sim.Match.fast_forward, which skips the quiet ticks, and a pong.snapshot of the
+# match is packed at the first tick of every chunk. A worker restores the snapshot of its
+# chunk and plays on from there, so no worker plays the ticks before its chunk.
+#
+# A frame is written from the pixels of the offscreen surface itself: pygame.image.save
+# for an image, and the surface's raw buffer for a video. A raw video is one file with
+# every frame at a fixed offset, so the workers write their frames straight into place
+# with no copies and nothing to join up afterwards. The file is in the pixel format of
+# the surface, and the ffmpeg command that encodes it is printed at the end.
+
+import argparse
+import concurrent.futures
+import os
+import sys
+
+from pong import snapshot
+from pong.replay import END, LEFT, RIGHT, ReplayInput, end_tick
+from pong.sim import Match
+
+IMAGE_FORMATS = ('png', 'bmp', 'tga', 'jpg')
+
+# User-defined classes
+
+class FrameWriter:
+   # An object in this class writes every frame drawn on a surface to a file. It is the
+   # display of an offscreen Game, so Game.draw writes a frame each time it presents one
+
+   def __init__(self, surface, output, first_frame, video_start=0):
+      # Initialize a FrameWriter.
+      # - surface is the offscreen pygame.Surface the frames are drawn on
+      # - output is the name of a raw video file, or the name of a file for every frame
+      #   with a %d for the frame number
+      # - first_frame is the number of the first frame written
+      # - video_start is the number of the frame at the start of the video file
+      self.surface = surface
+      self.output = output
+      self.frame = first_frame
+      self.video = None
+      if not is_image_pattern(output):
+         self.video = open(output, 'r+b', buffering=0)
+         self.video.seek((first_frame - video_start) * frame_size(surface))
+
+   def update(self, rects):
+      # write the frame that was just drawn, the rects that changed do not matter as the
+      # whole frame is written
+      if self.video is not None:
+         # the buffer is the surface's own pixels, written without copying them
+         self.video.write(self.surface.get_buffer())
+      else:
+         import pygame
+         pygame.image.save(self.surface, self.output % self.frame)
+      self.frame += 1
+
+   def close(self):
+      if self.video is not None:
+         self.video.close()
+
+# User-defined functions
+
+def is_image_pattern(output):
+   # return True if output names one image per frame rather than a raw video
+   return '%' in output
+
+def frame_size(surface):
+   # return the bytes in one raw video frame of surface
+   return surface.get_pitch() * surface.get_height()
+
+def pixel_format(surface):
+   # return the ffmpeg name of the pixel format of surface in memory
+   masks = surface.get_masks()
+   if surface.get_bytesize() == 4 and sys.byteorder == 'little' and masks[:3] == (0xff0000, 0xff00, 0xff):
+      return 'bgra' if masks[3] else 'bgr0'
+   if surface.get_bytesize() == 4 and sys.byteorder == 'little' and masks[:3] == (0xff, 0xff00, 0xff0000):
+      return 'rgba' if masks[3] else 'rgb0'
+   return None
+
+def bot_recording(left, right, seed, max_ticks):
+   # Play a tournament game between the bots named left and right and return it in the
+   # form pong.replay.load returns a recording, as a (settings, records) tuple
+   from pong.ai import BotInput
+   from pong.tournament import make_bot, serve
+   x_velocity, y_velocity = serve(seed)
+   settings = {'window_width': 500, 'window_height': 400, 'x_velocity': x_velocity, 'y_velocity': y_velocity}
+   match = Match(**settings)
+   bots = BotInput(make_bot(left), make_bot(right))
+   records = []
+   velocities = [0, 0]
+   while match.continue_game and match.tick < max_ticks:
+      match.step(bots)
+      # step sets the velocities before the update, so they were set at the tick before
+      for paddle, velocity in ((LEFT, match.left_paddle.velocity), (RIGHT, match.right_paddle.velocity)):
+         if velocity != velocities[paddle]:
+            records.append((match.tick - 1, paddle, velocity))
+            velocities[paddle] = velocity
+   records.append((match.tick, END, 0))
+   return settings, records
+
+def plan(settings, records, start, end, chunk):
+   # Play the match once and return the list of (first frame, frames, snapshot) chunks
+   # from tick start to tick end, or to the end of the match if it is over or the
+   # recording ends sooner
+   # - frame n shows the match at tick n, after n updates
+   stop = end_tick(records)
+   if stop is not None:
+      # the frame of the last recorded tick is the last one
+      end = min(end, stop + 1)
+   match = Match(**settings)
+   input_source = ReplayInput(records)
+   chunks = []
+   first = start
+   match.fast_forward(input_source, first)
+   # the match stops short of first once it is over
+   while first < end and match.tick == first:
+      state = snapshot.pack(match)
+      match.fast_forward(input_source, min(chunk, end - first))
+      # the last tick of a match that ended in the chunk gets a frame too
+      last = match.tick if match.continue_game else match.tick + 1
+      frames = min(last, end) - first
+      chunks.append((first, frames, state))
+      first += frames
+   return chunks
+
+def render_chunk(settings, records, first, frames, state, output, skin='classic', video_start=0):
+   # Render frames frames from the snapshot state at tick first, in a worker process,
+   # and return (first, frames)
+   import pygame
+   from pong.game import Game
+   match = snapshot.restore(Match(**settings), state)
+   surface = pygame.Surface((match.window_width, match.window_height), 0, 32)
+   writer = FrameWriter(surface, output, first, video_start)
+   game = Game(surface, match.window_width, match.window_height, match, input_source=ReplayInput(records), \
+               skin=skin, display=writer, rewind=None)
+   game.draw()
+   for _ in range(frames - 1):
+      if game.continue_game:
+         game.update()
+         game.decide_continue()
+      game.draw()
+   writer.close()
+   return first, frames
+
+def export(settings, records, output, start=0, end=36000, chunk=300, workers=None, skin='classic', \
+           report=None):
+   # Render the ticks from start to end of a match to output in a pool of workers and
+   # return the number of frames
+   # - settings and records are a recording as returned by pong.replay.load
+   # - output is a raw video file, or a file name with a %d for an image per frame
+   # - chunk is the number of frames a worker renders at a time
+   # - report is called with (first, frames) as each chunk is written, or None
+   chunks = plan(settings, records, start, end, chunk)
+   total = sum(frames for _, frames, _ in chunks)
+   if not is_image_pattern(output):
+      # make the whole file so every worker can write its frames into place
+      import pygame
+      size = frame_size(pygame.Surface((settings['window_width'], settings['window_height']), 0, 32))
+      with open(output, 'wb') as video:
+         video.truncate(total * size)
+   with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+      futures = [executor.submit(render_chunk, settings, records, first, frames, state, output, skin, start) \
+                 for first, frames, state in chunks]
+      for future in concurrent.futures.as_completed(futures):
+         result = future.result()
+         if report is not None:
+            report(result)
+   return total
+
+def main(argv=None):
+   # render a recording or a bot game from the command line
+   parser = argparse.ArgumentParser(description='Render a Pong match to images or raw video')
+   parser.add_argument('recording', nargs='?', help='recording written by python -m pong --record')
+   parser.add_argument('--bots', nargs=2, metavar=('LEFT', 'RIGHT'), \
+                       help='render a tournament game between two bots instead of a recording')
+   parser.add_argument('--seed', type=int, default=0, help='seed of the serve of a bot game')
+   parser.add_argument('--output', required=True, \
+                       help='a directory for an image per frame, or a file ending in .raw for raw video')
+   parser.add_argument('--image-format', choices=IMAGE_FORMATS, default='png')
+   parser.add_argument('--start', type=int, default=0, help='first tick to render')
+   parser.add_argument('--end', type=int, default=36000, help='tick to stop at, if the match is not over sooner')
+   parser.add_argument('--chunk', type=int, default=300, help='frames a worker renders at a time')
+   parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+   parser.add_argument('--skin', default='classic', help='pong.sprites skin to draw with')
+   options = parser.parse_args(argv)
+   if (options.recording is None) == (options.bots is None):
+      parser.error('give either a recording or --bots')
+   if options.bots:
+      settings, records = bot_recording(options.bots[0], options.bots[1], options.seed, options.end)
+   else:
+      from pong import replay
+      settings, records = replay.load(options.recording)
+   output = options.output
+   if not output.endswith('.raw'):
+      os.makedirs(output, exist_ok=True)
+      output = os.path.join(output, '%06d.' + options.image_format)
+
+   def report(result):
+      print('frames %d to %d written' % (result[0], result[0] + result[1] - 1), flush=True)
+
+   total = export(settings, records, output, options.start, options.end, options.chunk, options.workers, \
+                  options.skin, report)
+   print('%d frames written to %s' % (total, options.output))
+   if not is_image_pattern(output):
+      import pygame
+      surface = pygame.Surface((settings['window_width'], settings['window_height']), 0, 32)
+      print('encode with: ffmpeg -f rawvideo -pix_fmt %s -s %dx%d -r 60 -i %s match.mp4' % \
+            (pixel_format(surface), surface.get_width(), surface.get_height(), options.output))
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,125 @@
+# Pong frame time profiler
+#
+# Records how long each phase of a frame takes (handling events, updating, drawing,
+# drawing the scores and waiting for the clock) into fixed size ring buffers, so the
+# last few seconds of frames can be looked at without the profiler allocating anything
+# per frame. It can report the p50, p99 and max of every phase, draw them over the game
+# and write the recorded frames to a CSV or JSON file.
+
+import csv
+import json
+import time
+from array import array
+
+from pong.hud import TextCache
+
+# User-defined classes
+
+class FrameProfiler:
+   # An object in this class records the time spent in each phase of the last frames
+
+   PHASES = ('events', 'update', 'draw', 'score', 'tick')
+
+   def __init__(self, capacity=600, overlay=False):
+      # Initialize a FrameProfiler.
+      # - self is the FrameProfiler to initialize
+      # - capacity is the int number of frames kept, older frames are overwritten
+      # - overlay is True to draw the statistics over the game
+      # - times holds one array of seconds per phase, index is the slot of the frame
+      #   being recorded and count is the number of frames recorded so far
+      self.capacity = capacity
+      self.overlay = overlay
+      self.times = {phase: array('d', [0.0]) * capacity for phase in self.PHASES}
+      self.index = 0
+      self.count = 0
+      self.last_time = 0.0
+      self.overlay_lines = ()
+      self.overlay_time = 0.0
+      self.text_cache = None
+
+   def start_frame(self):
+      # start recording a new frame in the next slot of the ring buffers
+      for phase_times in self.times.values():
+         phase_times[self.index] = 0.0
+      self.last_time = time.perf_counter()
+
+   def lap(self, phase):
+      # add the time since the last lap, or the start of the frame, to phase
+      now = time.perf_counter()
+      self.times[phase][self.index] += now - self.last_time
+      self.last_time = now
+
+   def end_frame(self):
+      # finish the frame and move on to the next slot
+      self.index = (self.index + 1) % self.capacity
+      self.count += 1
+
+   def frames(self):
+      # return the number of frames held in the ring buffers
+      return min(self.count, self.capacity)
+
+   def samples(self, phase):
+      # return the recorded times of phase from the oldest frame to the newest
+      phase_times = self.times[phase]
+      if self.count < self.capacity:
+         return phase_times[:self.count]
+      return phase_times[self.index:] + phase_times[:self.index]
+
+   def frame_samples(self):
+      # return the total time of every recorded frame from the oldest to the newest
+      totals = array('d', [0.0]) * self.frames()
+      for phase in self.PHASES:
+         for frame, value in enumerate(self.samples(phase)):
+            totals[frame] += value
+      return totals
+
+   def summary(self):
+      # return a dict from each phase, and 'frame' for the whole frame, to a dict of the
+      # p50, p99 and max times in milliseconds
+      result = {}
+      columns = [(phase, self.samples(phase)) for phase in self.PHASES]
+      columns.append(('frame', self.frame_samples()))
+      for name, values in columns:
+         ordered = sorted(values)
+         if not ordered:
+            result[name] = {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+            continue
+         result[name] = {'p50': ordered[(len(ordered) - 1) // 2] * 1000, \
+                         'p99': ordered[int((len(ordered) - 1) * 0.99)] * 1000, \
+                         'max': ordered[-1] * 1000}
+      return result
+
+   def dump(self, path):
+      # write the recorded frames to path, as JSON if it ends in .json and CSV otherwise
+      if path.endswith('.json'):
+         data = {'frames': self.frames(), 'summary': self.summary(), \
+                 'samples': {phase: list(self.samples(phase)) for phase in self.PHASES}}
+         with open(path, 'w') as file:
+            json.dump(data, file, indent=1)
+         return
+      columns = [self.samples(phase) for phase in self.PHASES]
+      with open(path, 'w', newline='') as file:
+         writer = csv.writer(file)
+         writer.writerow(self.PHASES)
+         for row in zip(*columns):
+            writer.writerow(['%.6f' % value for value in row])
+
+   def draw_overlay(self, surface, position=(0, 60), color='green', size=20, refresh=0.5):
+      # Draw the p50/p99/max of every phase on surface and return the rects drawn in
+      # - refresh is the number of seconds between new statistics, so the text is not
+      #   rendered again every frame
+      if self.text_cache is None:
+         self.text_cache = TextCache(max_entries=4 * (len(self.PHASES) + 1))
+      now = time.perf_counter()
+      if now - self.overlay_time >= refresh:
+         self.overlay_time = now
+         self.overlay_lines = tuple('%-6s %5.2f %5.2f %5.2f ms' % (name, values['p50'], \
+                                    values['p99'], values['max']) \
+                                    for name, values in self.summary().items())
+      rects = []
+      x, y = position
+      for line in self.overlay_lines:
+         text = self.text_cache.render(line, size, color)
+         rects.append(surface.blit(text, (x, y)))
+         y += text.get_height()
+      return rects
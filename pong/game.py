@@ -0,0 +1,576 @@
+# Pong game window
+#
+# The pygame front end of Pong v3: Game draws a pong.sim.Match in a window and plays it
+# with the keyboard. Importing this module does not open a window or start any part of
+# SDL; main does that, and only starts the display. The font module is started the
+# first time text is drawn, and the modules for network play, recording, bots and
+# profiling are only imported when their options are used.
+#
+#    python -m pong            the same as python pong3.py
+#    python -m pong --headless a match between bots without pygame
+
+# imports the pygame module
+import argparse
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+import pygame
+from pong.hud import Scoreboard
+from pong.render import DirtyRenderer, ScaledDisplay
+from pong.sprites import SKINS, SpriteCache
+from pong.sim import Match
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+# User-defined fucntions
+
+def main(argv=None):
+   # read the command line options
+   parser = argparse.ArgumentParser(description='Pong v3')
+   parser.add_argument('--full-redraw', action='store_true', \
+                       help='redraw and update the whole window every frame')
+   parser.add_argument('--swept', action='store_true', \
+                       help='find the exact time the ball touches the walls and paddles')
+   parser.add_argument('--profile', metavar='PATH', \
+                       help='time every frame and write the times to PATH (.csv or .json) on exit')
+   parser.add_argument('--profile-overlay', action='store_true', \
+                       help='time every frame and show the frame times over the game')
+   parser.add_argument('--record', metavar='PATH', help='save the paddle inputs to PATH')
+   parser.add_argument('--replay', metavar='PATH', help='watch a match saved with --record')
+   parser.add_argument('--connect', metavar='HOST:PORT', \
+                       help='play one paddle of a match on a server started with python -m pong.net')
+   parser.add_argument('--bot', choices=('left', 'right', 'both'), \
+                       help='let the computer play the left, right or both paddles')
+   parser.add_argument('--render-fps', type=int, default=60, \
+                       help='most frames drawn per second, 0 for no limit (default 60)')
+   parser.add_argument('--balls', type=int, metavar='N', \
+                       help='play with N balls at once, which bounce off each other')
+   parser.add_argument('--fullscreen', action='store_true', \
+                       help='fill the screen at its native resolution')
+   parser.add_argument('--window', metavar='WIDTHxHEIGHT', \
+                       help='window size, needs --scaler software (default the playfield size)')
+   parser.add_argument('--scaler', choices=('hardware', 'software'), default='hardware', \
+                       help='scale the playfield to the window on the GPU or with pygame (default hardware)')
+   parser.add_argument('--skin', choices=sorted(SKINS), default='classic', \
+                       help='colors and look of the ball and paddles (default classic)')
+   parser.add_argument('--rewind', type=float, default=10, metavar='SECONDS', \
+                       help='seconds of play kept for rewinding with backspace, 0 to turn off (default 10)')
+   parser.add_argument('--save', metavar='PATH', help='save the match to PATH on exit')
+   parser.add_argument('--resume', metavar='PATH', help='go on with a match saved with --save')
+   parser.add_argument('--broadcast', type=int, metavar='PORT', \
+                       help='let spectators watch the match with python -m pong.broadcast --watch')
+   parser.add_argument('--startup-times', action='store_true', \
+                       help='print how long importing, starting SDL and the first frame took')
+   options = parser.parse_args(argv)
+   window_size = None
+   if options.window:
+      try:
+         window_size = tuple(int(size) for size in options.window.lower().split('x'))
+      except ValueError:
+         window_size = ()
+      if len(window_size) != 2 or min(window_size) <= 0:
+         parser.error('--window must look like 1280x720')
+      if options.scaler != 'software':
+         # SDL picks the size of a hardware scaled window itself, so the size would be ignored
+         parser.error('--window only works with --scaler software')
+   if (options.save or options.resume) and (options.balls or options.connect or options.replay):
+      parser.error('--save and --resume only work for a one ball game on this computer')
+   if options.record and (options.resume or options.balls or options.connect):
+      # a recording starts from a new one ball match, which is all its header can hold,
+      # and replays the inputs alone, while a client's match is reset by the server
+      parser.error('--record does not work with --resume, --balls or --connect')
+   if options.broadcast is not None and options.balls:
+      parser.error('--broadcast only works for a one ball game')
+   # only the display is needed to play, the font module starts when text is first drawn
+   # and sound and joysticks are never used
+   init_started = time.perf_counter()
+   pygame.display.init()
+   # the playfield the game is played and drawn on, the window shows it scaled
+   window_width = 500
+   window_height = 400
+   settings = {'window_width': window_width, 'window_height': window_height, 'swept': options.swept}
+   if options.replay or options.record:
+      from pong import replay
+   if options.replay:
+      settings = replay.load(options.replay)[0]
+      window_width, window_height = settings['window_width'], settings['window_height']
+   display = ScaledDisplay((window_width, window_height), window_size, options.fullscreen, options.scaler)
+   # set the title of the display window
+   pygame.display.set_caption('Pong')   
+   # get the playfield surface
+   w_surface = display.surface
+   init_seconds = time.perf_counter() - init_started
+
+   # create a game object
+   if options.balls:
+      from pong.multiball import MultiBallMatch
+      match = MultiBallMatch(options.balls, window_width, window_height)
+   elif options.resume:
+      from pong import snapshot
+      match = snapshot.load(options.resume)
+   else:
+      match = Match(**settings)
+   client = None
+   if options.connect:
+      from pong import net
+      host, port = options.connect.rsplit(':', 1)
+      client = net.start_client_thread(host, int(port))
+      match = client.match
+   profiler = None
+   if options.profile or options.profile_overlay:
+      from pong.frametime import FrameProfiler
+      profiler = FrameProfiler(overlay=options.profile_overlay)
+   bots = None
+   if options.bot:
+      from pong.ai import BotInput, InterceptBot
+      bots = BotInput(InterceptBot() if options.bot in ('left', 'both') else None, \
+                      InterceptBot() if options.bot in ('right', 'both') else None)
+   recorder = None
+   if options.record:
+      recorder = replay.InputRecorder(options.record, match)
+   rewind = None
+   if options.rewind > 0 and not (options.balls or client or recorder or options.replay):
+      # a rewound match can not be recorded or played on a server, and a snapshot only
+      # holds one ball
+      from pong.snapshot import RewindBuffer
+      rewind = RewindBuffer(match, options.rewind)
+   broadcaster = None
+   if options.broadcast is not None:
+      from pong.broadcast import start_broadcaster_thread
+      broadcaster = start_broadcaster_thread(match, '127.0.0.1', options.broadcast)
+   game = Game(w_surface, window_width, window_height, match, full_redraw=options.full_redraw, \
+               render_fps=options.render_fps, profiler=profiler, recorder=recorder, \
+               client=client, input_source=bots, skin=options.skin, display=display, rewind=rewind, \
+               broadcaster=broadcaster)
+   if options.startup_times:
+      frame_started = time.perf_counter()
+      game.draw()
+      print('import %.3f s, display start %.3f s, first frame %.3f s' % (IMPORT_SECONDS, \
+            init_seconds, time.perf_counter() - frame_started))
+   # start the main game loop by calling the play method on the game object
+   if options.replay:
+      replay.replay(options.replay, viewer=game, match=match)
+   else:
+      game.play() 
+   if recorder is not None:
+      recorder.close()
+   if options.save:
+      from pong import snapshot
+      snapshot.save(options.save, match)
+   if options.profile:
+      profiler.dump(options.profile)
+   # quit pygame and clean up the pygame window
+   pygame.quit() 
+   
+# User-defined classes
+
+class Game:
+   # An object in this class represents a complete game.
+
+   def __init__(self, surface, window_width, window_height, match=None, full_redraw=False, render_fps=60, \
+                profiler=None, recorder=None, client=None, input_source=None, skin='classic', \
+                display=None, rewind=None, broadcaster=None):
+      # Initialize a Game.
+      # - self is the Game to initialize
+      # - surface is the pygame.Surface of the playfield, the window or drawn offscreen
+      # - match is the pong.sim.Match to play, a new one is created if it is None
+      # - full_redraw is True to redraw and update the whole window every frame
+      # - render_fps is the most frames drawn per second
+      # - profiler is the pong.frametime.FrameProfiler that times every frame, or None
+      # - recorder is the pong.replay.InputRecorder that saves the paddle inputs, or None
+      # - client is the pong.net.MatchClient that plays the match on a server, or None
+      # - input_source sets the paddle velocities before every update, such as a
+      #   pong.ai.BotInput, or None to only use the keyboard
+      # - skin is the name of a pong.sprites skin that gives the colors and look
+      # - display is the pong.render.ScaledDisplay that shows surface, or None when
+      #   surface is the window itself
+      # - rewind is the pong.snapshot.RewindBuffer that keeps the last seconds of the
+      #   match so backspace can rewind it, or None
+      # - broadcaster is the pong.broadcast.Broadcaster that sends the match to
+      #   spectators after every update, or None
+      # - bg_color us the background colour
+      # - FPS is the number of updates per second, the game speed does not depend on how
+      #   fast frames are drawn
+      # - render_FPS is the most frames drawn per second, 0 draws as fast as the display can
+      # - max_catch_up is the most updates run for one frame after a slow frame
+      # - game_Clock is our games timekeeping clock
+      # - close_clicked is a boolean set as false
+      # - self.continue_game is True until the match is over, a resumed match may be over
+      #   already
+      # - paused is True while the space bar has paused the game
+      # - idle_timeout is the most seconds to wait for an event while nothing moves
+
+      # === general game objects 
+      self.surface = surface
+      self.window_width = window_width
+      self.window_height = window_height
+      self.sprite_cache = SpriteCache(skin) # draws the ball and paddles once
+      self.sprite_cache.sync(surface)
+      self.bg_color = pygame.Color(self.sprite_cache.skin['background'])
+      self.FPS = 60
+      self.render_FPS = render_fps
+      self.max_catch_up = 5
+      self.game_Clock = pygame.time.Clock()
+      self.close_clicked = False
+      self.paused = False
+      self.idle_timeout = 0.5
+      self.scoreboard = Scoreboard(window_width) # caches the rendered score text
+      self.renderer = DirtyRenderer(surface, self.bg_color, full_redraw, display)
+      self.profiler = profiler
+      self.recorder = recorder
+      self.client = client
+      self.input_source = input_source
+      self.rewind = rewind
+      self.broadcaster = broadcaster
+      
+      # === game specific objects   
+   
+      # the match holds the ball, the paddles and the scores, this Game only draws it
+      self.match = match if match is not None else Match(window_width, window_height)
+      self.continue_game = self.match.continue_game
+      self.paddle_color = pygame.Color(self.sprite_cache.skin['paddle'])
+      self.ball_colour = self.sprite_cache.skin['ball']
+      
+      # create the left and right paddles and the ball that draw the match, a match with
+      # many balls is drawn by one Balls object
+      self.left_paddle = Paddle(self.paddle_color, self.match.left_paddle, self.sprite_cache)
+      self.right_paddle = Paddle(self.paddle_color, self.match.right_paddle, self.sprite_cache)
+      if hasattr(self.match, 'balls'):
+         self.ball = Balls(self.ball_colour, self.match.balls, self.sprite_cache)
+      else:
+         self.ball = Ball(self.ball_colour, self.match.ball, self.sprite_cache)
+
+   def play(self):
+      # Play the game until the player presses the close box.
+      # - self is the Game that should be continued or not.
+
+      # the time since the last frame is added to the accumulator and the game is updated
+      # once for every 1 / FPS seconds in it. Frames are drawn between the last two updates
+      # using the time left in the accumulator, so a slow frame does not slow the game
+      update_time = 1 / self.FPS
+      accumulator = 0.0
+      previous_time = time.perf_counter()
+
+      profiler = self.profiler
+      redraw = True
+      while not self.close_clicked:  # until player clicks close box
+         if self.idle():
+            # nothing moves until there is an event, so draw the last frame once and
+            # sleep until then instead of drawing the same frame 60 times a second. It is
+            # only drawn again when an event changed the game or the window, not for a
+            # timeout or a mouse motion
+            if redraw:
+               self.draw()
+            redraw = self.wait_for_event()
+            accumulator = 0.0
+            previous_time = time.perf_counter()
+            continue
+         redraw = True
+
+         # play frame
+         if profiler is not None:
+            profiler.start_frame()
+         self.handle_events()
+         if profiler is not None:
+            profiler.lap('events')
+         current_time = time.perf_counter()
+         accumulator += current_time - previous_time
+         previous_time = current_time
+         
+         updates = 0
+         while accumulator >= update_time and updates < self.max_catch_up:
+            if self.continue_game:
+               self.update()
+               self.decide_continue()
+            accumulator -= update_time
+            updates += 1
+         if updates == self.max_catch_up:
+            # too far behind to catch up, drop the rest instead of falling further behind
+            accumulator = min(accumulator, update_time)
+         if profiler is not None:
+            profiler.lap('update')
+            
+         self.draw(accumulator / update_time)
+         if profiler is not None:
+            profiler.lap('draw')
+         self.game_Clock.tick(self.render_FPS) # draw at most render_FPS frames per second 
+         if profiler is not None:
+            profiler.lap('tick')
+            profiler.end_frame()
+
+   def idle(self):
+      # return True if nothing on screen can change until there is an event, because the
+      # game is over or paused
+      return not self.continue_game or self.paused
+
+   def wait_for_event(self):
+      # sleep until there is an event or idle_timeout seconds have passed, then handle
+      # the events and return True if any of them changed what is on the screen
+      event = pygame.event.wait(int(self.idle_timeout * 1000))
+      changed = False
+      if event.type != pygame.NOEVENT:
+         changed = self.handle_event(event)
+      return self.handle_events() or changed
+
+   def handle_events(self):
+      # Handle each user event by changing the game state appropriately.
+      # - self is the Game whose events will be handled
+      # - returns True if any event changed the game or the window
+      changed = False
+      for event in pygame.event.get():
+         if self.handle_event(event):
+            changed = True
+      return changed
+
+   def handle_event(self, event):
+      # - pygame.KEYDOWN and pygame.KEYUP are functions used to check for keyboard presses
+      # - returns True if the event changed the game or the window, so it must be drawn
+      changed = False
+      if event.type == pygame.QUIT:
+         self.close_clicked = True
+         
+      if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE): # the window must be drawn again
+         self.renderer.invalidate()
+         self.sprite_cache.sync(self.surface)
+         changed = True
+         
+      if event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE and self.rewind is not None:
+         self.rewind_match(1.0) # works after the game is over too
+         changed = True
+         
+      if event.type == pygame.KEYDOWN and self.continue_game: # Has there been a keyboard click?
+         self.handle_key_down(event.key)
+         changed = True
+         
+      if event.type == pygame.KEYUP and self.continue_game: # Has there been a keyboard release?
+         self.handle_key_up(event.key)         
+         changed = True
+      return changed
+            
+   def handle_key_down(self,key):      
+      # change the velocity of the paddles which moves the paddles up and down
+      # depending on what key is pressed 
+      # velocity_change is used for this and is of type int
+       # the paddle velocities of self.match are of type int 
+      
+      velocity_change = 5
+      
+      # the space bar pauses and unpauses a game played on this computer
+      if key == pygame.K_SPACE and self.client is None:
+         self.paused = not self.paused
+      
+      # when the 'q' key is pressed down the left paddle moves up
+      # when the 'a' key is pressed down the left paddle moves down      
+      if key == pygame.K_q:
+         self.match.left_paddle.velocity = -velocity_change
+      if key == pygame.K_a:
+         self.match.left_paddle.velocity = velocity_change   
+      
+      # when the 'p' key is pressed down the right paddle moves up
+      # when the 'l' key is pressed down the right paddle moves down         
+      if key == pygame.K_p:
+         self.match.right_paddle.velocity = -velocity_change
+      if key == pygame.K_l:
+         self.match.right_paddle.velocity = velocity_change          
+         
+   def handle_key_up(self,key):
+      # when the 'q' key or the 'a' is released the left paddle stops moving because the velocity is
+      # changed to zero
+      # the paddle velocities of self.match are of type int 
+      if key == pygame.K_q:
+         self.match.left_paddle.velocity = 0 
+      if key == pygame.K_a:
+         self.match.left_paddle.velocity = 0
+      
+      # when the 'p' key or the 'l' is released the right paddle stops moving   
+      if key == pygame.K_p:
+         self.match.right_paddle.velocity = 0
+      if key == pygame.K_l:
+         self.match.right_paddle.velocity = 0         
+      
+   def draw(self, alpha=1.0):
+      # Draw all game objects.
+      # - self is the Game to draw      
+      # - alpha is the float fraction of the way from the previous update to the last one
+      #   to draw the moving objects at
+      # the renderer erases where the objects were last frame and only updates the parts
+      # of the display that changed, unless full_redraw is set. The scores go first, so
+      # wiping out an old score never wipes out part of the ball
+      draw_functions = (self.draw_score, self.draw_entities)
+      if self.profiler is not None and self.profiler.overlay:
+         draw_functions += (self.draw_profile,)
+      self.renderer.present(draw_functions, alpha)
+      
+   def draw_entities(self, alpha=1.0):
+      # blit the sprites of the ball and paddles in one call and return their rects
+      blits, rects = [], []
+      for entity in (self.ball, self.left_paddle, self.right_paddle):
+         entity_blits, rect = entity.blits(alpha)
+         blits.extend(entity_blits)
+         rects.append(rect)
+      self.surface.blits(blits, False)
+      return rects
+
+   def draw_score(self, alpha=1.0):
+      # Draw the scores only if they changed or something was erased over them, and
+      # return no rects, so the renderer never erases them
+      # - a new score is erased and drawn here and shown with renderer.update_fixed
+      if self.profiler is not None:
+         self.profiler.lap('draw')
+      scoreboard, renderer = self.scoreboard, self.renderer
+      scores = (self.match.score_left, self.match.score_right)
+      old_rects = scoreboard.rects() if scoreboard.scores is not None else ()
+      changed = scores != scoreboard.scores
+      if changed or any(renderer.damaged(rect) for rect in old_rects):
+         # clear the old text first, antialiased text blitted over itself gets bolder
+         for rect in old_rects:
+            self.surface.fill(self.bg_color, rect)
+         new_rects = scoreboard.draw(self.surface, scores[0], scores[1])
+         if changed:
+            # a score that did not change looks the same, only the erased part of it
+            # has to be updated and that is updated already
+            renderer.update_fixed(old_rects + new_rects)
+      if self.profiler is not None:
+         self.profiler.lap('score')
+      return []
+
+   def draw_profile(self, alpha=1.0):
+      # draw the frame time statistics of the profiler over the game
+      return self.profiler.draw_overlay(self.surface)
+
+   def rewind_match(self, seconds):
+      # put the match back to where it was seconds ago, or as far back as the rewind
+      # buffer goes, without drawing the objects sliding back there
+      self.rewind.rewind(self.match, round(seconds * self.FPS))
+      self.continue_game = self.match.continue_game
+      self.ball.save_position()
+      self.left_paddle.save_position()
+      self.right_paddle.save_position()
+
+   def update(self):
+      # Update the game objects for the next frame.
+      # - self is the Game to update      
+      if self.rewind is not None:
+         self.rewind.record(self.match)
+      # remember where the objects were so frames can be drawn between the two updates
+      self.ball.save_position()
+      self.left_paddle.save_position()
+      self.right_paddle.save_position()
+      if self.input_source is not None:
+         velocities = self.input_source.velocities(self.match)
+         if velocities is not None:
+            self.match.set_paddle_velocities(velocities[0], velocities[1])
+      if self.recorder is not None:
+         self.recorder.observe(self.match)
+      if self.client is not None:
+         # the server plays the match, the client predicts it with the player's paddle
+         self.client.set_velocity(self.client.paddle().velocity)
+         self.client.update()
+      else:
+         self.match.update()
+                
+   def decide_continue(self):
+      # Decides game end condition, then shows the tick to the spectators, so the last
+      # one they get says the match is over
+      self.match.decide_continue()
+      self.continue_game = self.match.continue_game
+      if self.broadcaster is not None:
+         self.broadcaster.publish(self.match)
+
+   def show(self, match):
+      # Show a match that is run by pong.sim.Match.run, so the window can be used as a viewer
+      # - returns False once the player clicks the close box
+      self.handle_events()
+      self.draw()
+      self.game_Clock.tick(self.FPS)
+      return not self.close_clicked
+
+class Ball:
+   # An object in this class draws the Ball of a match  
+   
+   def __init__(self, ball_color, ball, sprite_cache):
+      # Initialize the ball.
+      # - self is the Ball to initialize
+      # - color is the pygame.Color of the Ball
+      # - ball is the pong.sim.Ball that holds the center, radius and velocity
+      # - sprite_cache is the pong.sprites.SpriteCache that holds the picture of the Ball
+      self.color = pygame.Color(ball_color)
+      self.ball = ball
+      self.sprite_cache = sprite_cache
+      self.previous_center = list(ball.center)
+                            
+   def save_position(self):
+      # remember the center before the match is updated
+      self.previous_center[0], self.previous_center[1] = self.ball.center
+
+   def blits(self, alpha=1.0):
+      # Return the (sprite, rect) pairs that draw the Ball and the rect they cover
+      # - self is the Ball      
+      # - alpha is the fraction of the way from the previous center to the current one
+      previous, current = self.previous_center, self.ball.center
+      radius = self.ball.radius
+      rect = pygame.Rect(round(previous[0] + (current[0] - previous[0]) * alpha) - radius, \
+                         round(previous[1] + (current[1] - previous[1]) * alpha) - radius, \
+                         2 * radius, 2 * radius)
+      return [(self.sprite_cache.ball(radius, self.color), rect)], rect
+
+class Balls:
+   # An object in this class draws all the balls of a pong.multiball.MultiBallMatch
+
+   def __init__(self, ball_color, balls, sprite_cache):
+      # Initialize the balls.
+      # - balls is the pong.batch.BallArray that holds the centers and velocities
+      # - sprite_cache is the pong.sprites.SpriteCache that holds the picture of a ball
+      self.color = pygame.Color(ball_color)
+      self.balls = balls
+      self.sprite_cache = sprite_cache
+      self.previous_x = balls.center_x.copy()
+      self.previous_y = balls.center_y.copy()
+
+   def save_position(self):
+      # remember the centers before the match is updated
+      self.previous_x[...] = self.balls.center_x
+      self.previous_y[...] = self.balls.center_y
+
+   def blits(self, alpha=1.0):
+      # Return the (sprite, position) pairs that draw every ball and one rect that
+      # covers them all, so the renderer has one rect to erase and update instead of
+      # thousands
+      balls, radius = self.balls, self.balls.radius
+      xs = (self.previous_x + (balls.center_x - self.previous_x) * alpha - radius).round().astype(int)
+      ys = (self.previous_y + (balls.center_y - self.previous_y) * alpha - radius).round().astype(int)
+      if not len(xs):
+         return [], pygame.Rect(0, 0, 0, 0)
+      sprite = self.sprite_cache.ball(radius, self.color)
+      rect = pygame.Rect(int(xs.min()), int(ys.min()), int(xs.max() - xs.min()) + 2 * radius, \
+                         int(ys.max() - ys.min()) + 2 * radius)
+      return [(sprite, position) for position in zip(xs.tolist(), ys.tolist())], rect
+
+class Paddle:
+   # An object in this class draws a paddle of a match  
+   
+   def __init__(self, paddle_color, paddle, sprite_cache):
+      # Initialize the paddle
+      # - self is the paddle to initialize
+      # - paddle_color is the Color of the paddle
+      # - paddle is the pong.sim.Paddle that holds the position and velocity
+      # - sprite_cache is the pong.sprites.SpriteCache that holds the picture of the paddle
+      self.paddle_color = paddle_color
+      self.paddle = paddle
+      self.sprite_cache = sprite_cache
+      self.previous_top = paddle.top
+          
+   def save_position(self):
+      # remember the top before the match is updated
+      self.previous_top = self.paddle.top
+
+   def blits(self, alpha=1.0):
+      # Return the (sprite, rect) pairs that draw the paddle and the rect they cover
+      # - self is the paddle    
+      # - alpha is the fraction of the way from the previous top to the current one
+      paddle = self.paddle
+      top = round(self.previous_top + (paddle.top - self.previous_top) * alpha)
+      rect = pygame.Rect(paddle.left, top, paddle.width, paddle.height)
+      sprite = self.sprite_cache.paddle(paddle.width, paddle.height, self.paddle_color)
+      return [(sprite, rect)], rect
@@ -0,0 +1,105 @@
+# Pong HUD text
+#
+# Fonts are loaded once per size and rendered text surfaces are kept in a bounded
+# least recently used cache keyed by (text, size, color), so drawing the same score
+# every frame does not look up a font or rasterize glyphs again. The Scoreboard only
+# asks the cache for new surfaces when a score actually changes. Nothing is loaded,
+# not even the pygame font module, until the first text is drawn.
+
+from collections import OrderedDict
+
+import pygame
+
+# User-defined classes
+
+class TextCache:
+   # An object in this class renders text and remembers the rendered surfaces
+
+   def __init__(self, max_entries=64, font_name=""):
+      # Initialize a TextCache.
+      # - self is the TextCache to initialize
+      # - max_entries is the int number of rendered surfaces to keep
+      # - font_name is the name passed to pygame.font.SysFont
+      # - hits and misses count the render calls answered from the cache or not
+      self.max_entries = max_entries
+      self.font_name = font_name
+      self.fonts = {}
+      self.surfaces = OrderedDict()
+      self.hits = 0
+      self.misses = 0
+
+   def font(self, size):
+      # return the font for the int size, loading it the first time it is used
+      font = self.fonts.get(size)
+      if font is None:
+         if not pygame.font.get_init():
+            # the font module is only started once there is text to draw
+            pygame.font.init()
+         font = pygame.font.SysFont(self.font_name, size)
+         self.fonts[size] = font
+      return font
+
+   def render(self, text, size, color):
+      # return an antialiased surface with the text drawn in color
+      # - color is a pygame.Color or anything it accepts
+      key = (text, size, tuple(pygame.Color(color)))
+      surface = self.surfaces.get(key)
+      if surface is not None:
+         self.hits += 1
+         self.surfaces.move_to_end(key)
+         return surface
+      self.misses += 1
+      surface = self.font(size).render(text, True, color)
+      if pygame.display.get_surface() is not None:
+         # blitting is fastest from the display's own pixel format
+         surface = surface.convert_alpha()
+      self.surfaces[key] = surface
+      if len(self.surfaces) > self.max_entries:
+         self.surfaces.popitem(last=False)
+      return surface
+
+   def stats(self):
+      # return a dict of the cache counters
+      return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.surfaces), \
+              'fonts': len(self.fonts)}
+
+class Scoreboard:
+   # An object in this class draws the two scores at the top corners of the window
+
+   def __init__(self, window_width, text_cache=None, size=72, color='white'):
+      # Initialize a Scoreboard.
+      # - self is the Scoreboard to initialize
+      # - window_width is the int width used to right align the right score
+      # - text_cache is the TextCache to render with, a new one is made if it is None
+      # - renders counts the times a score changed and its surface was looked up again
+      self.window_width = window_width
+      self.text_cache = text_cache if text_cache is not None else TextCache()
+      self.size = size
+      self.color = pygame.Color(color)
+      self.scores = None
+      self.left_scoreboard = None
+      self.right_scoreboard = None
+      self.renders = 0
+
+   def set_scores(self, score_left, score_right):
+      # get new score surfaces if either score changed since the last call
+      if self.scores == (score_left, score_right):
+         return
+      self.scores = (score_left, score_right)
+      self.left_scoreboard = self.text_cache.render(str(score_left), self.size, self.color)
+      self.right_scoreboard = self.text_cache.render(str(score_right), self.size, self.color)
+      self.renders += 1
+
+   def rects(self):
+      # return the pygame.Rect of the left and right score on the window
+      left_rect = self.left_scoreboard.get_rect(topleft=(0, 0))
+      right_rect = self.right_scoreboard.get_rect(topright=(self.window_width, 0))
+      return left_rect, right_rect
+
+   def draw(self, surface, score_left, score_right):
+      # draw both scores on the surface and return their rects
+      self.set_scores(score_left, score_right)
+      left_rect, right_rect = self.rects()
+      surface.blit(self.left_scoreboard, left_rect)
+      surface.blit(self.right_scoreboard, right_rect)
+      return left_rect, right_rect
@@ -0,0 +1,208 @@
+# Pong multi-ball mode
+#
+# A MultiBallMatch plays the rules of pong.sim.Match with any number of balls, for party
+# games and stress tests. The balls live in a pong.batch.BallArray and every tick moves
+# all of them with NumPy. Each ball scores on its own: a ball that reaches the left or
+# right wall gives the other player a point and bounces on, like the single ball does.
+# With every ball scoring, the game is played to 11 points per ball unless told otherwise.
+#
+# Checking every ball against both paddles and against every other ball does not scale,
+# so collisions go through a broadphase: a uniform grid of rows one ball wide, swept and
+# pruned along x within each row. The ball indices are kept sorted by (row, center x),
+# and the order from the last tick is sorted again each tick, which is nearly free
+# because balls only move a few pixels. Two balls can then only touch if they are in the
+# same or neighbouring rows and fewer than two radii apart in x, so every ball is only
+# compared with the few balls right after it in its own row and in the row below, and a
+# paddle is only checked against the slices of the rows it covers whose x can reach its
+# front, found by binary search.
+
+# Balls that touch and are moving towards each other swap velocities, which is an
+# elastic bounce between balls of the same mass along the line between them for a head
+# on hit, and keeps the velocities whole numbers. A ball bounces off at most one other
+# ball per tick; the rest of its contacts are handled on the next ticks. A ball that has
+# just gone past a wall does not bounce off other balls until it is back in the
+# playfield: the wall has already turned it round, and taking another ball's velocity
+# could send it further out, where every tick would turn it round again and score.
+
+import numpy as np
+
+from pong.batch import BallArray
+from pong.sim import Match
+
+# User-defined classes
+
+class MultiBallMatch(Match):
+   # An object in this class represents a game of Pong with many balls
+
+   __slots__ = ('balls', 'ball_collisions', 'order', 'keys', 'row_width', 'winning_score', \
+                'pairs_checked', '_index')
+
+   def __init__(self, balls=100, window_width=500, window_height=400, x_velocity=9, y_velocity=3, \
+                seed=0, ball_collisions=True, winning_score=None):
+      # Initialize a MultiBallMatch.
+      # - balls is the int number of balls, the first one starts where the ball of a
+      #   Match does and the others at random places with random velocities from seed
+      # - ball_collisions is False to let the balls pass through each other
+      # - winning_score is the int score that ends the game, 11 for every ball if None
+      # - the other arguments are the same as for pong.sim.Match
+      # - ball is kept as a copy of the first ball after every tick, so bots and other
+      #   code made for one ball can follow it
+      # - order is the array of ball indices sorted by (row, center x), and keys is the
+      #   sorted array of their row * row_width + center x
+      # - pairs_checked is the number of ball pairs compared in the last tick
+      super().__init__(window_width, window_height, x_velocity, y_velocity)
+      self.balls = BallArray(balls, self.ball_radius)
+      self.ball_collisions = ball_collisions
+      self.winning_score = winning_score if winning_score is not None else 11 * balls
+      self.balls.load(0, self.ball)
+      rng = np.random.default_rng(seed)
+      radius = self.ball_radius
+      margin = self.paddle_margin_wall + self.paddle_width + radius
+      self.balls.center_x[1:] = rng.integers(margin, window_width - margin, balls - 1)
+      self.balls.center_y[1:] = rng.integers(radius, window_height - radius, balls - 1)
+      self.balls.velocity_x[1:] = rng.choice((-9, -7, -5, -3, 3, 5, 7, 9), balls - 1)
+      self.balls.velocity_y[1:] = rng.choice((-4, -3, -2, -1, 1, 2, 3, 4), balls - 1)
+      self.row_width = 2 * window_width
+      self.order = self._index = np.arange(balls)
+      self.keys = None
+      self.pairs_checked = 0
+      self.sort()
+
+   def update(self):
+      # Update the match for the next tick, in the same order as Match.update
+      balls = self.balls
+      balls.move(self.window_width, self.window_height)
+      self.move_paddle()
+      self.sort()
+      self.collision_paddles()
+      if self.ball_collisions:
+         self.collision_balls()
+
+      # every ball that hit the left or right wall scores a point
+      radius = self.ball_radius
+      self.score_right += int(np.count_nonzero(balls.center_x < radius))
+      self.score_left += int(np.count_nonzero(balls.center_x > self.window_width - radius))
+      self.ball.place((int(balls.center_x[0]), int(balls.center_y[0])), \
+                      (int(balls.velocity_x[0]), int(balls.velocity_y[0])))
+      self.tick += 1
+
+   def decide_continue(self):
+      # the game ends when a player reaches the winning score
+      if self.score_left >= self.winning_score or self.score_right >= self.winning_score:
+         self.continue_game = False
+
+   def quiet_ticks(self, input_source=None):
+      # with many balls something happens nearly every tick, so fast_forward steps
+      return 0
+
+   def sort(self):
+      # sort the ball indices by (row, center x) again, starting from last tick's order
+      balls, order = self.balls, self.order
+      keys = balls.center_y[order] // (2 * self.ball_radius) * self.row_width
+      keys += balls.center_x[order]
+      resort = np.argsort(keys, kind='stable')
+      self.order = order[resort]
+      self.keys = keys[resort]
+
+   def collision_paddles(self):
+      # bounce the balls off the front of each paddle like Ball.collision_paddle, only
+      # checking the balls whose x can reach the front in the rows the paddle covers
+      balls, radius = self.balls, self.ball_radius
+      row_height = 2 * radius
+      for paddle, edge, sign in ((self.left_paddle, -radius, -1), (self.right_paddle, radius, 1)):
+         # the leading edge x + edge is inside the paddle for left <= x + edge < left + width
+         rows = np.arange(paddle.top // row_height, (paddle.top + paddle.height - 1) // row_height + 1)
+         starts = np.searchsorted(self.keys, rows * self.row_width + paddle.left - edge)
+         ends = np.searchsorted(self.keys, rows * self.row_width + paddle.left + paddle.width - edge)
+         candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+         if not len(candidates):
+            continue
+         y = balls.center_y[candidates]
+         hit = (y >= paddle.top) & (y < paddle.top + paddle.height) \
+               & (balls.velocity_x[candidates] * sign > 0)
+         hit_balls = candidates[hit]
+         balls.velocity_x[hit_balls] = -balls.velocity_x[hit_balls]
+
+   def collision_balls(self):
+      # swap the velocities of touching balls that are moving towards each other
+      first, second = self.touching_pairs()
+      if len(first) == 0:
+         return
+      balls = self.balls
+      approaching = (balls.velocity_x[second] - balls.velocity_x[first]) \
+                    * (balls.center_x[second] - balls.center_x[first]) \
+                    + (balls.velocity_y[second] - balls.velocity_y[first]) \
+                    * (balls.center_y[second] - balls.center_y[first]) < 0
+      first, second = first[approaching], second[approaching]
+      # leave out the balls that are past a wall, so they come back in first
+      inside = self.inside()
+      keep = inside[first] & inside[second]
+      first, second = first[keep], second[keep]
+      if len(first) == 0:
+         return
+
+      # keep each ball in only one pair: the pair with the lowest number among its pairs
+      number = np.arange(len(first))
+      lowest = np.full(balls.n, len(first))
+      np.minimum.at(lowest, first, number)
+      np.minimum.at(lowest, second, number)
+      keep = (lowest[first] == number) & (lowest[second] == number)
+      first, second = first[keep], second[keep]
+      for velocity in (balls.velocity_x, balls.velocity_y):
+         velocity[first], velocity[second] = velocity[second], velocity[first]
+
+   def inside(self):
+      # return a bool array that is True for the balls that are not past any wall
+      balls, radius = self.balls, self.ball_radius
+      return (balls.center_x >= radius) & (balls.center_x <= self.window_width - radius) \
+             & (balls.center_y >= radius) & (balls.center_y <= self.window_height - radius)
+
+   def strays(self):
+      # return the number of balls past a wall that the next tick does not bring back
+      # into the playfield, which should always be none
+      balls, radius = self.balls, self.ball_radius
+      stray = np.zeros(balls.n, dtype=bool)
+      for center, velocity, size in ((balls.center_x, balls.velocity_x, self.window_width), \
+                                    (balls.center_y, balls.velocity_y, self.window_height)):
+         ahead = center + velocity
+         stray |= ((center < radius) | (center > size - radius)) & ((ahead < radius) | (ahead > size - radius))
+      return int(np.count_nonzero(stray))
+
+   def touching_pairs(self):
+      # Return two arrays of ball indices, where first[k] and second[k] are the balls of
+      # the k-th pair of touching balls
+      balls, order, keys = self.balls, self.order, self.keys
+      n = balls.n
+      diameter = 2 * self.ball_radius
+      sorted_x = balls.center_x[order]
+      sorted_y = balls.center_y[order]
+      firsts, seconds = [], []
+      checked = 0
+
+      # compare every ball with the balls from where the row below reaches its x onwards,
+      # then with the balls right after it in its own row, for as long as some of them are
+      # still closer than a diameter in x
+      below = np.searchsorted(keys, keys + (self.row_width - diameter), 'right')
+      for neighbours, reach in ((below, self.row_width + diameter), (self._index + 1, diameter)):
+         alive = self._index
+         limit = keys + reach
+         step = 0
+         while len(alive):
+            other = neighbours[alive] + step
+            inside = other < n
+            alive, other = alive[inside], other[inside]
+            near = keys[other] < limit[alive]
+            alive, other = alive[near], other[near]
+            if not len(alive):
+               break
+            checked += len(alive)
+            dx = sorted_x[other] - sorted_x[alive]
+            dy = sorted_y[other] - sorted_y[alive]
+            touching = dx * dx + dy * dy < diameter * diameter
+            firsts.append(order[alive[touching]])
+            seconds.append(order[other[touching]])
+            step += 1
+      self.pairs_checked = checked
+      if not firsts:
+         return self._index[:0], self._index[:0]
+      return np.concatenate(firsts), np.concatenate(seconds)
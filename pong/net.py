@@ -0,0 +1,333 @@
+# Pong over the network
+#
+# A MatchServer plays the one real Match and two MatchClients, one for each paddle,
+# talk to it over UDP with asyncio. Clients only send their paddle velocity when it
+# changes (and again every tick until the server has seen it), and the server sends
+# every client a small snapshot of the match after every tick.
+#
+# A client does not wait for the server to move its own paddle. It keeps a copy of the
+# match and plays it forward itself every tick. When a snapshot arrives, the copy is
+# reset to the server state and the ticks the server has not played yet are played
+# again with the velocities the player used for them, so the player's paddle responds
+# at once and the ball and the other paddle follow the server.
+#
+# Both ends can drop and delay the packets they send, to try the game on localhost
+# with the latency and loss of a real network:
+#
+#    python -m pong.net --local --latency 0.05 --loss 0.1
+
+import argparse
+import asyncio
+import random
+import struct
+import threading
+
+from pong.sim import Match
+
+JOIN = struct.Struct('<c')
+WELCOME = struct.Struct('<cB')
+INPUT = struct.Struct('<cIb')
+SNAPSHOT = struct.Struct('<cIIIhhhhhhbbBBB')
+LEFT, RIGHT = 0, 1
+
+# User-defined classes
+
+class LossyTransport:
+   # An object in this class sends datagrams with a delay and drops some of them
+
+   def __init__(self, transport, latency=0.0, loss=0.0, seed=None):
+      # Initialize a LossyTransport.
+      # - transport is the asyncio DatagramTransport to send with
+      # - latency is the float number of seconds every datagram is held back
+      # - loss is the float chance that a datagram is dropped
+      self.transport = transport
+      self.latency = latency
+      self.loss = loss
+      self.random = random.Random(seed)
+      self.loop = asyncio.get_running_loop()
+
+   def sendto(self, data, address=None):
+      if self.loss and self.random.random() < self.loss:
+         return
+      if self.latency:
+         self.loop.call_later(self.latency, self.deliver, data, address)
+      else:
+         self.deliver(data, address)
+
+   def deliver(self, data, address):
+      # datagrams that were held back are dropped if the transport closed meanwhile
+      if not self.transport.is_closing():
+         self.transport.sendto(data, address)
+
+   def close(self):
+      self.transport.close()
+
+class MatchServer(asyncio.DatagramProtocol):
+   # An object in this class plays a Match for two remote players
+
+   def __init__(self, match=None, tick_rate=60, latency=0.0, loss=0.0, seed=None):
+      # Initialize a MatchServer.
+      # - match is the Match to play, a new one is made if it is None
+      # - tick_rate is the int number of updates per second
+      # - latency, loss and seed are passed to the LossyTransport
+      # - players holds the address of the left and right player, acks holds the
+      #   client tick of the last input used from each player and the server tick it
+      #   was used at
+      self.match = match if match is not None else Match()
+      self.tick_rate = tick_rate
+      self.latency = latency
+      self.loss = loss
+      self.seed = seed
+      self.players = [None, None]
+      self.acks = [(0, 0), (0, 0)]
+      self.transport = None
+      self.ready = None
+
+   def connection_made(self, transport):
+      self.transport = LossyTransport(transport, self.latency, self.loss, self.seed)
+      self.ready = asyncio.get_running_loop().create_future()
+
+   def datagram_received(self, data, address):
+      kind = data[:1]
+      if kind == b'J':
+         if address not in self.players and None in self.players:
+            self.players[self.players.index(None)] = address
+         if address in self.players:
+            self.transport.sendto(WELCOME.pack(b'W', self.players.index(address)), address)
+         if None not in self.players and not self.ready.done():
+            self.ready.set_result(True)
+      elif kind == b'I' and len(data) == INPUT.size and address in self.players:
+         side = self.players.index(address)
+         _, client_tick, velocity = INPUT.unpack(data)
+         # inputs can arrive late or twice, only a newer one changes the paddle
+         if client_tick > self.acks[side][0]:
+            paddle = self.match.left_paddle if side == LEFT else self.match.right_paddle
+            paddle.velocity = velocity
+            self.acks[side] = (client_tick, self.match.tick)
+
+   def snapshot(self, side):
+      # return the snapshot datagram of the match for the player on side
+      match = self.match
+      client_tick, server_tick = self.acks[side]
+      return SNAPSHOT.pack(b'S', match.tick, client_tick, server_tick, \
+                           match.ball.center[0], match.ball.center[1], \
+                           match.ball.velocity[0], match.ball.velocity[1], \
+                           match.left_paddle.top, match.right_paddle.top, \
+                           match.left_paddle.velocity, match.right_paddle.velocity, \
+                           match.score_left, match.score_right, match.continue_game)
+
+   async def run(self, ticks=None):
+      # Wait for both players, then update the match tick_rate times a second and send
+      # every player a snapshot after each update, until the match is over
+      await self.ready
+      loop = asyncio.get_running_loop()
+      next_time = loop.time()
+      while self.match.continue_game and (ticks is None or self.match.tick < ticks):
+         self.match.update()
+         self.match.decide_continue()
+         for side, address in enumerate(self.players):
+            self.transport.sendto(self.snapshot(side), address)
+         next_time += 1 / self.tick_rate
+         await asyncio.sleep(max(0.0, next_time - loop.time()))
+      return self.match
+
+class MatchClient(asyncio.DatagramProtocol):
+   # An object in this class plays one paddle of a match on a MatchServer
+
+   def __init__(self, latency=0.0, loss=0.0, seed=None, history=256):
+      # Initialize a MatchClient.
+      # - latency, loss and seed are passed to the LossyTransport
+      # - history is the int number of past ticks of input remembered for replaying
+      # - match is the predicted Match that is drawn, side is LEFT or RIGHT once the
+      #   server has answered and tick is the number of updates played by this client
+      self.latency = latency
+      self.loss = loss
+      self.seed = seed
+      self.match = Match()
+      self.side = None
+      self.tick = 0
+      self.velocity = 0
+      self.history = [0] * history
+      self.last_change = 0
+      self.acked = 0
+      self.tick_offset = None
+      self.snapshot = None
+      self.server_tick = -1
+      self.transport = None
+      self.loop = None
+
+   def connection_made(self, transport):
+      self.transport = LossyTransport(transport, self.latency, self.loss, self.seed)
+      self.loop = asyncio.get_running_loop()
+
+   def datagram_received(self, data, address):
+      kind = data[:1]
+      if kind == b'W' and len(data) == WELCOME.size:
+         self.side = WELCOME.unpack(data)[1]
+      elif kind == b'S' and len(data) == SNAPSHOT.size:
+         snapshot = SNAPSHOT.unpack(data)
+         # keep only the newest snapshot, older ones that arrive late are useless
+         if snapshot[1] > self.server_tick:
+            self.server_tick = snapshot[1]
+            self.snapshot = snapshot
+
+   def send(self, data):
+      # send a datagram from any thread
+      self.loop.call_soon_threadsafe(self.transport.sendto, data)
+
+   def paddle(self):
+      # return the paddle of the predicted match that this client plays
+      return self.match.left_paddle if self.side == LEFT else self.match.right_paddle
+
+   def set_velocity(self, velocity):
+      # set the velocity of the player's paddle from the next update on
+      self.velocity = velocity
+
+   def update(self):
+      # Play one tick: send the input if the server has not seen it yet, move the
+      # predicted match to the newest server state and play it forward to now
+      if self.side is None:
+         self.send(JOIN.pack(b'J'))
+         return
+      self.tick += 1
+      self.history[self.tick % len(self.history)] = self.velocity
+      if self.velocity != self.history[(self.tick - 1) % len(self.history)]:
+         self.last_change = self.tick
+      if self.last_change > self.acked:
+         self.send(INPUT.pack(b'I', self.last_change, self.velocity))
+
+      snapshot, self.snapshot = self.snapshot, None
+      if snapshot is None:
+         # no news from the server, keep playing the prediction
+         self.paddle().velocity = self.velocity
+         if self.match.continue_game:
+            self.match.update()
+            self.match.decide_continue()
+         return
+      self.reconcile(snapshot)
+
+   def reconcile(self, snapshot):
+      # reset the predicted match to a snapshot and play again the ticks the server has
+      # not played yet, with the velocities the player used for them
+      _, server_tick, acked, acked_server_tick = snapshot[:4]
+      if acked > self.acked:
+         self.acked = acked
+         # the server used the input of client tick acked at server tick acked_server_tick
+         self.tick_offset = acked_server_tick - acked
+      if self.tick_offset is None:
+         self.tick_offset = server_tick - self.tick
+      load_snapshot(self.match, snapshot)
+      first = server_tick - self.tick_offset + 1
+      ticks = min(max(self.tick - first + 1, 0), len(self.history) - 1)
+      for client_tick in range(self.tick - ticks + 1, self.tick + 1):
+         if not self.match.continue_game:
+            break
+         self.paddle().velocity = self.history[client_tick % len(self.history)]
+         self.match.update()
+         self.match.decide_continue()
+      self.paddle().velocity = self.velocity
+
+# User-defined functions
+
+def load_snapshot(match, snapshot):
+   # copy the state in an unpacked snapshot datagram into match
+   (_, match.tick, _, _, x, y, velocity_x, velocity_y, match.left_paddle.top, \
+    match.right_paddle.top, match.left_paddle.velocity, match.right_paddle.velocity, \
+    match.score_left, match.score_right, continue_game) = snapshot
+   match.ball.place((x, y), (velocity_x, velocity_y))
+   match.continue_game = bool(continue_game)
+
+async def start_server(host='127.0.0.1', port=0, **options):
+   # start a MatchServer on host and port and return it, options go to MatchServer
+   loop = asyncio.get_running_loop()
+   _, server = await loop.create_datagram_endpoint(lambda: MatchServer(**options), \
+                                                   local_addr=(host, port))
+   return server
+
+async def start_client(host, port, **options):
+   # connect a MatchClient to the server at host and port and return it
+   loop = asyncio.get_running_loop()
+   _, client = await loop.create_datagram_endpoint(lambda: MatchClient(**options), \
+                                                   remote_addr=(host, port))
+   return client
+
+def start_client_thread(host, port, **options):
+   # run a MatchClient in an asyncio loop on another thread, for a game loop that is
+   # not asyncio, and return it once it is connected
+   started = threading.Event()
+   holder = []
+
+   def serve():
+      async def connect():
+         holder.append(await start_client(host, port, **options))
+         started.set()
+         await asyncio.Event().wait()
+      asyncio.run(connect())
+
+   threading.Thread(target=serve, daemon=True).start()
+   started.wait()
+   return holder[0]
+
+def follow_ball(client, speed=5):
+   # return the velocity that moves the client's paddle towards the ball
+   paddle, ball = client.paddle(), client.match.ball
+   middle = paddle.top + paddle.height // 2
+   if ball.center[1] < middle - speed:
+      return -speed
+   if ball.center[1] > middle + speed:
+      return speed
+   return 0
+
+async def play_local(ticks=600, latency=0.0, loss=0.0, seed=0, tick_rate=60):
+   # Play a match on localhost between two clients that follow the ball.
+   # - returns the server Match and the two clients after ticks server updates
+   server = await start_server(tick_rate=tick_rate, latency=latency, loss=loss, seed=seed)
+   port = server.transport.transport.get_extra_info('sockname')[1]
+   clients = [await start_client('127.0.0.1', port, latency=latency, loss=loss, seed=seed + side + 1) \
+              for side in (LEFT, RIGHT)]
+
+   async def play(client):
+      loop = asyncio.get_running_loop()
+      next_time = loop.time()
+      while not server_task.done():
+         if client.side is not None:
+            client.set_velocity(follow_ball(client))
+         client.update()
+         next_time += 1 / tick_rate
+         await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+   server_task = asyncio.ensure_future(server.run(ticks))
+   await asyncio.gather(server_task, *(play(client) for client in clients))
+   server.transport.close()
+   for client in clients:
+      client.transport.close()
+   return server.match, clients
+
+def main(argv=None):
+   # run a server, or a localhost match between two bots
+   parser = argparse.ArgumentParser(description='Pong network server')
+   parser.add_argument('--host', default='127.0.0.1')
+   parser.add_argument('--port', type=int, default=7777)
+   parser.add_argument('--local', action='store_true', help='play two bots against each other on localhost')
+   parser.add_argument('--ticks', type=int, default=600, help='ticks to play with --local')
+   parser.add_argument('--latency', type=float, default=0.0, help='seconds every packet is delayed')
+   parser.add_argument('--loss', type=float, default=0.0, help='chance that a packet is dropped')
+   options = parser.parse_args(argv)
+   if options.local:
+      match, clients = asyncio.run(play_local(options.ticks, options.latency, options.loss))
+      print('server tick %d score %d-%d ball %s' % (match.tick, match.score_left, \
+            match.score_right, match.ball.center))
+      for client in clients:
+         print('client %d tick %d score %d-%d ball %s' % (client.side, client.match.tick, \
+               client.match.score_left, client.match.score_right, client.match.ball.center))
+      return
+
+   async def serve():
+      server = await start_server(options.host, options.port, latency=options.latency, loss=options.loss)
+      print('waiting for two players on %s:%d' % (options.host, options.port))
+      match = await server.run()
+      print('final score %d-%d' % (match.score_left, match.score_right))
+   asyncio.run(serve())
+
+if __name__ == '__main__':
+   main()
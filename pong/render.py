@@ -0,0 +1,188 @@
+# Pong dirty rectangle renderer
+#
+# Only the ball, the two paddles and the scores change from one frame to the next, so
+# instead of filling the whole window and pushing all of it to the display, the
+# renderer remembers the rect every entity was drawn in last frame. Each frame it
+# erases those rects, draws the entities again and passes only the old and new rects
+# to pygame.display.update. A full redraw can be asked for at any time, and is always
+# done for the first frame.
+#
+# Things that stay put, like the scores, are not erased every frame. They are drawn
+# again only when they change or when something was erased over them, which
+# DirtyRenderer.damaged tells, and the rects of a change are passed to update_fixed so
+# they are shown without being erased on the next frame.
+#
+# The game is always drawn on a playfield of a fixed logical size, so the physics and
+# the drawing cost do not depend on the size of the window. A ScaledDisplay shows that
+# playfield in a window or fullscreen at any resolution. By default SDL scales it on
+# the GPU (pygame.SCALED), so a 4K screen costs no more than the small window. The
+# software scaler instead draws on an offscreen surface and scales it into a cached
+# part of the window, for systems where the GPU scaler is not available.
+
+import pygame
+
+# User-defined classes
+
+class DirtyRenderer:
+   # An object in this class draws entities and updates only the changed parts of the display
+
+   def __init__(self, surface, bg_color, full_redraw=False, display=None):
+      # Initialize a DirtyRenderer.
+      # - self is the DirtyRenderer to initialize
+      # - surface is the pygame.Surface the entities are drawn on
+      # - bg_color is the pygame.Color used to erase
+      # - full_redraw is True to fill and update the whole surface every frame
+      # - display is the object whose update(rects) shows the changed rects, such as a
+      #   ScaledDisplay, or None for pygame.display
+      self.surface = surface
+      self.bg_color = bg_color
+      self.full_redraw = full_redraw
+      self.display = display if display is not None else pygame.display
+      self.previous = []
+      self.erased = []
+      self.fixed = []
+      self.invalid = True
+
+   def invalidate(self):
+      # redraw and update the whole surface on the next frame
+      self.invalid = True
+
+   def erase(self):
+      # fill the rects drawn last frame with the background colour
+      for rect in self.previous:
+         self.surface.fill(self.bg_color, rect)
+
+   def damaged(self, rect):
+      # return True if part of rect was erased this frame, so what is there must be
+      # drawn again
+      return rect.collidelist(self.erased) != -1
+
+   def update_fixed(self, rects):
+      # show rects that changed this frame but are not erased on the next one
+      self.fixed.extend(rects)
+
+   def draw(self, draw_functions, *args):
+      # Draw one frame and return the list of rects that changed.
+      # - draw_functions is a sequence of functions that draw one entity each and return
+      #   the pygame.Rect they drew in, or a sequence of rects, which are erased on the
+      #   next frame
+      # - args are passed on to every draw function
+      if self.full_redraw or self.invalid:
+         self.surface.fill(self.bg_color)
+         self.erased = [self.surface.get_rect()]
+      else:
+         self.erase()
+         self.erased = self.previous
+      self.fixed = []
+
+      current = []
+      for draw_function in draw_functions:
+         rects = draw_function(*args)
+         if isinstance(rects, pygame.Rect):
+            current.append(rects)
+         else:
+            current.extend(rects)
+
+      if self.full_redraw or self.invalid:
+         dirty = [self.surface.get_rect()]
+         self.invalid = False
+      else:
+         dirty = self.dirty_rects(self.previous, current) + self.fixed
+      self.previous = current
+      return dirty
+
+   def dirty_rects(self, previous, current):
+      # return the rects to update, an entity that moved a little gets one rect that
+      # covers where it was and where it is now
+      if len(previous) != len(current):
+         return previous + current
+      dirty = []
+      for old, new in zip(previous, current):
+         if old.colliderect(new):
+            dirty.append(old.union(new))
+         else:
+            dirty.append(old)
+            dirty.append(new)
+      return dirty
+
+   def present(self, draw_functions, *args):
+      # draw one frame and make the changed rects appear on the display
+      self.display.update(self.draw(draw_functions, *args))
+
+class ScaledDisplay:
+   # An object in this class shows a playfield of a fixed size in a window of any size
+
+   def __init__(self, playfield_size, window_size=None, fullscreen=False, scaler='hardware'):
+      # Initialize a ScaledDisplay and open its window.
+      # - playfield_size is the (width, height) the game is drawn at
+      # - window_size is the (width, height) of the window for the software scaler,
+      #   the hardware scaler picks the largest window that fits the desktop
+      # - fullscreen is True to fill the screen at its native resolution
+      # - scaler is 'hardware' to let SDL scale on the GPU or 'software' to scale with
+      #   pygame.transform.scale
+      # - surface is the playfield surface to draw on
+      self.playfield_size = tuple(playfield_size)
+      self.scaler = scaler
+      if scaler == 'hardware':
+         flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+         try:
+            self.window = pygame.display.set_mode(self.playfield_size, flags)
+            self.surface = self.window
+            self.target = None
+            return
+         except pygame.error:
+            # SDL could not make a GPU renderer, scale in software instead
+            self.scaler = 'software'
+      if fullscreen:
+         self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+      else:
+         self.window = pygame.display.set_mode(window_size or self.playfield_size)
+      self.surface = pygame.Surface(self.playfield_size).convert()
+      self.layout()
+
+   def layout(self):
+      # Work out the largest part of the window the playfield fits in without changing its
+      # shape, centred with black bars around it, and keep that part as the target
+      window_width, window_height = self.window.get_size()
+      width, height = self.playfield_size
+      scale = min(window_width / width, window_height / height)
+      size = (max(1, int(width * scale)), max(1, int(height * scale)))
+      self.target_rect = pygame.Rect((0, 0), size)
+      self.target_rect.center = self.window.get_rect().center
+      self.window.fill((0, 0, 0))
+      self.target = self.window.subsurface(self.target_rect)
+      self.scale_x = size[0] / width
+      self.scale_y = size[1] / height
+      self.whole_scale = self.scale_x.is_integer() and self.scale_y.is_integer()
+      self.playfield_rect = pygame.Rect((0, 0), self.playfield_size)
+      pygame.display.flip()
+
+   def window_rect(self, rect):
+      # return the window rect a playfield rect is scaled to, grown to whole pixels
+      left = int(rect.left * self.scale_x)
+      top = int(rect.top * self.scale_y)
+      right = -int(-rect.right * self.scale_x)
+      bottom = -int(-rect.bottom * self.scale_y)
+      return pygame.Rect(left + self.target_rect.left, top + self.target_rect.top, \
+                         right - left, bottom - top)
+
+   def update(self, rects):
+      # show the changed playfield rects in the window
+      if self.target is None:
+         pygame.display.update(rects)
+         return
+      if not rects:
+         return
+      window_rects = [self.window_rect(rect) for rect in rects]
+      if not self.whole_scale:
+         pygame.transform.scale(self.surface, self.target_rect.size, self.target)
+      else:
+         # a whole number scale maps every playfield pixel to the same block of window
+         # pixels, so only the changed rects need to be scaled
+         for rect, window_rect in zip(rects, window_rects):
+            rect = rect.clip(self.playfield_rect)
+            if rect.width and rect.height:
+               window_rect = self.window_rect(rect).move(-self.target_rect.left, -self.target_rect.top)
+               pygame.transform.scale(self.surface.subsurface(rect), window_rect.size, \
+                                      self.target.subsurface(window_rect))
+      pygame.display.update(window_rects)
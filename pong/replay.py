@@ -0,0 +1,129 @@
+# Pong input recording and replay
+#
+# The paddle velocities are the only input to a match, so a match can be saved as the
+# list of times they changed and played again by the simulation to get exactly the
+# same match. A recording is a small binary file: a header with the Match settings,
+# then one 6 byte record per change, (tick, paddle, velocity), with paddle 0 for the
+# left paddle and 1 for the right one. The last record has paddle END and the tick the
+# match ended at, so a match that was quit before it was over replays to where it was
+# quit rather than on until someone wins. Version 1 recordings have no end record.
+#
+#    python pong3.py --record match.rec
+#    python -m pong.replay match.rec --seek 3600
+
+import argparse
+import struct
+
+from pong.sim import Match, ScriptedInput
+
+MAGIC = b'PONG'
+VERSION = 2
+VERSIONS = (1, 2)
+HEADER = struct.Struct('<4sBHHbbB')
+RECORD = struct.Struct('<IBb')
+LEFT, RIGHT = 0, 1
+END = 255
+
+# User-defined classes
+
+class InputRecorder:
+   # An object in this class writes the paddle velocity changes of a match to a file
+
+   def __init__(self, path, match):
+      # Initialize an InputRecorder and write the header of the recording.
+      # - self is the InputRecorder to initialize
+      # - path is the name of the file to write
+      # - match is the Match being recorded, before its first update
+      self.file = open(path, 'wb')
+      self.file.write(HEADER.pack(MAGIC, VERSION, match.window_width, match.window_height, \
+                      match.ball.velocity[0], match.ball.velocity[1], match.swept))
+      self.match = match
+      self.velocities = [0, 0]
+      self.observe(match)
+
+   def record(self, tick, paddle, velocity):
+      # write one change of the velocity of paddle at tick
+      self.file.write(RECORD.pack(tick, paddle, velocity))
+      self.velocities[paddle] = velocity
+
+   def observe(self, match):
+      # record the paddle velocities of match that changed since the last call, call
+      # this before every update of the match
+      for paddle, velocity in ((LEFT, match.left_paddle.velocity), (RIGHT, match.right_paddle.velocity)):
+         if velocity != self.velocities[paddle]:
+            self.record(match.tick, paddle, velocity)
+
+   def close(self):
+      # write the end record with the tick the match got to and close the file
+      self.file.write(RECORD.pack(self.match.tick, END, 0))
+      self.file.close()
+
+class ReplayInput(ScriptedInput):
+   # An input source that plays back the velocity changes of a recording
+
+   def __init__(self, records):
+      # - records is a sequence of (tick, paddle, velocity) tuples in tick order
+      script = {}
+      velocities = [0, 0]
+      for tick, paddle, velocity in records:
+         if paddle == END:
+            continue
+         velocities[paddle] = velocity
+         script[tick] = tuple(velocities)
+      ScriptedInput.__init__(self, script)
+
+# User-defined functions
+
+def load(path):
+   # Read a recording.
+   # - returns a (settings, records) tuple where settings is a dict of Match arguments
+   #   and records is a list of (tick, paddle, velocity) tuples, ending with the end
+   #   record if the recording has one
+   with open(path, 'rb') as file:
+      data = file.read()
+   magic, version, width, height, x_velocity, y_velocity, swept = HEADER.unpack_from(data)
+   if magic != MAGIC or version not in VERSIONS:
+      raise ValueError('%s is not a version %d Pong recording' % (path, VERSION))
+   settings = {'window_width': width, 'window_height': height, 'x_velocity': x_velocity, \
+               'y_velocity': y_velocity, 'swept': bool(swept)}
+   body = memoryview(data)[HEADER.size:]
+   body = body[:len(body) - len(body) % RECORD.size]
+   return settings, list(RECORD.iter_unpack(body))
+
+def end_tick(records):
+   # return the tick the recorded match ended at, or None if records have no end record
+   if records and records[-1][1] == END:
+      return records[-1][0]
+   return None
+
+def replay(path, seek=None, viewer=None, match=None):
+   # Play a recording again and return the Match.
+   # - seek is the tick to stop at, None plays the whole match. The match stops at the
+   #   end of the recording even if seek is later
+   # - viewer is shown every tick, without one the match is played as fast as possible
+   # - match is a new Match made with the settings of the recording to play it in, one
+   #   is made if it is None
+   settings, records = load(path)
+   if match is None:
+      match = Match(**settings)
+   input_source = ReplayInput(records)
+   end = end_tick(records)
+   if end is not None:
+      seek = end if seek is None else min(seek, end)
+   if viewer is not None:
+      return match.run(input_source, seek, viewer)
+   return match.fast_forward(input_source, seek)
+
+def main(argv=None):
+   # play a recording from the command line and print where the match ended up
+   parser = argparse.ArgumentParser(description='Replay a Pong recording')
+   parser.add_argument('path', help='recording written by pong3.py --record')
+   parser.add_argument('--seek', type=int, help='tick to stop at')
+   options = parser.parse_args(argv)
+   match = replay(options.path, options.seek)
+   print('tick %d score %d-%d ball %s velocity %s paddles %d %d' % (match.tick, \
+         match.score_left, match.score_right, match.ball.center, match.ball.velocity, \
+         match.left_paddle.top, match.right_paddle.top))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,224 @@
+# Pong match server
+#
+# Hosts many matches in one asyncio event loop. Instead of one Game.play loop per
+# match, a TickScheduler wakes up on one shared clock and plays every match forward to
+# where it should be by now. When stepping all the matches takes longer than a tick,
+# the matches that did not get their turn fall behind and are played first on the next
+# wake up, and their lag (ticks behind the clock) is reported.
+#
+# A ShardedServer runs one TickScheduler per worker process and gives every new match
+# to the least loaded worker, so a busy server uses more than one core. Match ids are
+# given out by the ShardedServer, so the lag a worker reports for a match is under the
+# id ShardedServer.add returned for it.
+#
+#    python -m pong.server --matches 500 --workers 4 --seconds 10
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import time
+
+from pong.sim import HoldInput, Match
+
+# User-defined classes
+
+class HostedMatch:
+   # An object in this class is a match played by a TickScheduler
+
+   def __init__(self, match_id, match, input_source, start_tick):
+      # - match_id is the int id of the match on its scheduler
+      # - match is the pong.sim.Match and input_source gives its paddle velocities
+      # - start_tick is the scheduler tick the match was added at
+      # - played is the number of ticks played since it was added
+      self.match_id = match_id
+      self.match = match
+      self.input_source = input_source
+      self.start_tick = start_tick
+      self.played = 0
+
+   def lag(self, scheduler_tick):
+      # return the number of ticks the match is behind the scheduler clock
+      return scheduler_tick - self.start_tick - self.played
+
+class TickScheduler:
+   # An object in this class plays many matches on one shared clock
+
+   def __init__(self, tick_rate=60, budget=0.8, on_finish=None):
+      # Initialize a TickScheduler.
+      # - tick_rate is the int number of updates per second of every match
+      # - budget is the fraction of each tick that may be spent stepping matches, the
+      #   rest is left for the event loop to handle input and network traffic
+      # - on_finish is called with the HostedMatch of every match that ends
+      # - tick is the number of ticks of the shared clock so far
+      # - busy is the number of seconds spent stepping matches
+      self.tick_rate = tick_rate
+      self.budget = budget
+      self.tick = 0
+      self.matches = {}
+      self.on_finish = on_finish
+      self.finished = 0
+      self.busy = 0.0
+      self.started = None
+      self.wake_lag = 0.0
+      self.ids = itertools.count()
+
+   def add(self, match=None, input_source=None, match_id=None):
+      # host a match from the next tick on and return its id
+      # - match_id is the id to host it under, the next free one if it is None
+      if match_id is None:
+         match_id = next(self.ids)
+      match = match if match is not None else Match()
+      self.matches[match_id] = HostedMatch(match_id, match, input_source, self.tick)
+      return match_id
+
+   def remove(self, match_id):
+      # stop hosting a match and return its HostedMatch
+      return self.matches.pop(match_id)
+
+   def play_due(self, deadline):
+      # Play every match up to the scheduler tick, the most behind ones first, until
+      # deadline on the perf_counter clock
+      start = time.perf_counter()
+      hosted = sorted(self.matches.values(), key=lambda hosted: -hosted.lag(self.tick))
+      for entry in hosted:
+         while entry.lag(self.tick) > 0 and entry.match.continue_game:
+            entry.match.step(entry.input_source)
+            entry.played += 1
+         if not entry.match.continue_game:
+            self.finished += 1
+            self.remove(entry.match_id)
+            if self.on_finish is not None:
+               self.on_finish(entry)
+         if time.perf_counter() >= deadline:
+            break
+      self.busy += time.perf_counter() - start
+
+   async def run(self, seconds=None, until_empty=False):
+      # Run the shared clock for seconds, or forever if it is None
+      # - until_empty is True to stop once every match has finished
+      loop = asyncio.get_running_loop()
+      self.started = loop.time()
+      tick_time = 1 / self.tick_rate
+      while seconds is None or loop.time() - self.started < seconds:
+         if until_empty and not self.matches:
+            break
+         self.tick += 1
+         self.play_due(time.perf_counter() + tick_time * self.budget)
+         next_time = self.started + self.tick * tick_time
+         self.wake_lag = max(0.0, loop.time() - next_time)
+         await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+   def metrics(self):
+      # return a dict of the scheduler load and the lag of every hosted match
+      lags = {match_id: hosted.lag(self.tick) for match_id, hosted in self.matches.items()}
+      elapsed = self.tick / self.tick_rate
+      return {'tick': self.tick, 'matches': len(self.matches), 'finished': self.finished, \
+              'load': self.busy / elapsed if elapsed else 0.0, 'wake_lag_sec': self.wake_lag, \
+              'max_lag': max(lags.values(), default=0), 'match_lag': lags}
+
+class ShardedServer:
+   # An object in this class spreads matches over worker processes that each run a
+   # TickScheduler
+
+   def __init__(self, workers=None, tick_rate=60):
+      # Initialize a ShardedServer and start its workers.
+      # - workers is the int number of worker processes, one per core if it is None
+      # - tick_rate is passed to every TickScheduler
+      workers = workers or multiprocessing.cpu_count()
+      self.connections = []
+      self.processes = []
+      self.metrics = [{} for _ in range(workers)]
+      self.counts = [0] * workers
+      self.ids = itertools.count()
+      for _ in range(workers):
+         parent, child = multiprocessing.Pipe()
+         process = multiprocessing.Process(target=worker_main, args=(child, tick_rate), daemon=True)
+         process.start()
+         self.connections.append(parent)
+         self.processes.append(process)
+
+   def add(self, settings=None, input_source=None):
+      # Give a new match to the least loaded worker and return the id of the match
+      # - settings is a dict of pong.sim.Match arguments
+      # - input_source must be picklable, as it is sent to the worker
+      self.poll()
+      worker = min(range(len(self.connections)), \
+                   key=lambda index: (self.metrics[index].get('load', 0.0), self.counts[index]))
+      match_id = next(self.ids)
+      self.connections[worker].send(('add', match_id, settings or {}, input_source))
+      self.counts[worker] += 1
+      return match_id
+
+   def poll(self):
+      # Read the newest metrics the workers have sent and return the list of them, one
+      # dict per worker like TickScheduler.metrics. Its 'match_lag' holds only the
+      # matches that are behind, a hosted match that is not in it has no lag
+      # - this must be called every few seconds so the workers are not held up sending
+      #   them
+      for index, connection in enumerate(self.connections):
+         while connection.poll():
+            self.metrics[index] = connection.recv()
+            self.counts[index] = self.metrics[index]['matches']
+      return self.metrics
+
+   def close(self):
+      # stop the workers
+      for connection in self.connections:
+         connection.send(('stop',))
+      for process in self.processes:
+         process.join()
+
+# User-defined functions
+
+def worker_main(connection, tick_rate, report_every=0.5):
+   # Run a TickScheduler in a worker process, adding the matches sent on connection
+   # and sending back its metrics every report_every seconds
+   scheduler = TickScheduler(tick_rate)
+
+   async def commands():
+      last_report = 0.0
+      loop = asyncio.get_running_loop()
+      while True:
+         while connection.poll():
+            command = connection.recv()
+            if command[0] == 'stop':
+               return
+            scheduler.add(Match(**command[2]), command[3], command[1])
+         if loop.time() - last_report >= report_every:
+            last_report = loop.time()
+            metrics = scheduler.metrics()
+            # most matches are up to date, so only the ones that are behind are sent
+            metrics['match_lag'] = {match_id: lag for match_id, lag in metrics['match_lag'].items() if lag > 0}
+            connection.send(metrics)
+         await asyncio.sleep(1 / tick_rate)
+
+   async def serve():
+      clock = asyncio.ensure_future(scheduler.run())
+      await commands()
+      clock.cancel()
+
+   asyncio.run(serve())
+
+def main(argv=None):
+   # host matches between still paddles and print the load and lag of every worker
+   parser = argparse.ArgumentParser(description='Pong match server')
+   parser.add_argument('--matches', type=int, default=200, help='matches to host')
+   parser.add_argument('--workers', type=int, default=1, help='worker processes, 0 for one per core')
+   parser.add_argument('--seconds', type=float, default=5.0, help='seconds to run for')
+   options = parser.parse_args(argv)
+   server = ShardedServer(options.workers or None)
+   for _ in range(options.matches):
+      server.add({}, HoldInput())
+   end = time.monotonic() + options.seconds
+   while time.monotonic() < end:
+      time.sleep(1)
+      for index, metrics in enumerate(server.poll()):
+         if metrics:
+            print('worker %d tick %d matches %d finished %d load %.2f max lag %d lagging %d' % (index, \
+                  metrics['tick'], metrics['matches'], metrics['finished'], metrics['load'], \
+                  metrics['max_lag'], len(metrics['match_lag'])))
+   server.close()
+
+if __name__ == '__main__':
+   main()
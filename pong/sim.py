@@ -0,0 +1,401 @@
+# Pong simulation core
+#
+# The rules of Pong v3 without any display, font or clock. A Match holds the Ball, the
+# two Paddles and the scores and can be stepped one tick at a time, or run for many
+# ticks as fast as the CPU allows. Nothing in this module imports pygame, so it can be
+# used on headless machines for regression runs and for the bots.
+#
+# Paddle velocities come from an input source, which is any object with a
+# velocities(match) method that returns a (left, right) tuple of paddle velocities,
+# or None to keep the current ones. A viewer, such as the pygame Game in pong.game, can
+# be attached to watch a match; it is called with show(match) after every tick and
+# can return False to stop the run.
+#
+# By default the ball moves a whole velocity each tick and bounces once it has gone
+# past a wall or into the front of a paddle, like pong3.py always did. A fast ball can
+# then pass straight through a paddle. A swept Match instead finds the exact time the
+# ball touches each wall or paddle front during the tick and bounces it there, as
+# many times as needed, so the tick can be made longer or the ball faster without the
+# ball tunnelling through the paddles.
+#
+# Between bounces the ball moves in a straight line, so Match.fast_forward works out how
+# many ticks can pass before anything but the ball position changes and jumps over them
+# in one go, ending in exactly the same state as stepping every tick. Input sources can
+# have a next_change(match) method that returns the first tick at which they may give new
+# velocities, or None if they only change after a bounce or a point; input sources
+# without it are asked every tick, which turns the jumps off.
+#
+# The classes here use __slots__, so a Match with its Ball and Paddles carries no
+# per-object dicts and many of them can be kept in one process. A Ball owns its center
+# and velocity lists: they are changed in place and never replaced, so other code can
+# hold on to them to read the current position, and must copy them to keep an old one.
+# A Ball copies the lists it is made with. pong.batch.BallArray stores many balls in one
+# array per field instead.
+
+import bisect
+
+# User-defined classes
+
+class Match:
+   # An object in this class represents the state of one game of Pong
+
+   __slots__ = ('window_width', 'window_height', 'swept', 'time_step', 'tick', 'continue_game', \
+                'paddle_margin_wall', 'paddle_width', 'paddle_height', 'left_paddle', 'right_paddle', \
+                'ball_radius', 'ball', 'score_left', 'score_right')
+
+   def __init__(self, window_width=500, window_height=400, x_velocity=9, y_velocity=3, \
+                swept=False, time_step=1):
+      # Initialize a Match.
+      # - self is the Match to initialize
+      # - window_width and window_height are the int size of the playfield in pixels
+      # - x_velocity and y_velocity are the int starting velocity of the ball
+      # - swept is True to move the ball with Ball.sweep instead of Ball.move
+      # - time_step is the length of one tick in 1/60 seconds, it can only be changed
+      #   from 1 for a swept Match
+      # - tick is the number of updates played so far
+      # - continue_game is a boolean set as true until a player reaches 11 points
+      self.window_width = window_width
+      self.window_height = window_height
+      if time_step != 1 and not swept:
+         raise ValueError('only a swept Match can use a time_step other than 1')
+      self.swept = swept
+      self.time_step = time_step
+      self.tick = 0
+      self.continue_game = True
+
+      # Paddles specifications
+      self.paddle_margin_wall = 100
+      self.paddle_width = 12
+      self.paddle_height = 50
+      paddle_top = self.window_height // 2 - self.paddle_height // 2
+
+      # create the left and right paddles
+      self.left_paddle = Paddle(self.paddle_margin_wall, paddle_top, self.paddle_width, self.paddle_height)
+      self.right_paddle = Paddle(self.window_width - self.paddle_width - self.paddle_margin_wall, \
+                          paddle_top, self.paddle_width, self.paddle_height)
+
+      # create the ball
+      self.ball_radius = 6
+      center = [window_width // 2 - 7, window_height // 2 - 7]
+      self.ball = Ball(self.ball_radius, center, [x_velocity, y_velocity])
+
+      # create scoreboard values
+      self.score_left, self.score_right = 0, 0
+
+   def set_paddle_velocities(self, left_velocity, right_velocity):
+      # Set the velocity of both paddles
+      # - left_velocity and right_velocity are ints, negative moves the paddle up
+      self.left_paddle.velocity = left_velocity
+      self.right_paddle.velocity = right_velocity
+
+   def move_paddle(self):
+      # move both paddles by their velocities and keep them on screen
+      self.left_paddle.move(self.window_height, self.time_step)
+      self.right_paddle.move(self.window_height, self.time_step)
+
+   def update(self):
+      # Update the match for the next tick.
+      # - self is the Match to update
+      if self.swept:
+         # the paddles move first so the ball is swept against where they are this tick
+         self.move_paddle()
+         left_goals, right_goals = self.ball.sweep(self.window_width, self.window_height, \
+                                   self.left_paddle, self.right_paddle, self.time_step)
+         self.score_right += left_goals
+         self.score_left += right_goals
+         self.tick += 1
+         return
+
+      self.ball.move(self.window_width, self.window_height)
+      self.move_paddle()
+      self.ball.collision_paddle(self.left_paddle, self.right_paddle)
+
+      # check if the ball hit the left or right wall and discribute points accordingly
+      center = self.ball.center
+      if center[0] < self.ball_radius:
+         self.score_right += 1
+      if center[0] + self.ball_radius > self.window_width:
+         self.score_left += 1
+      self.tick += 1
+
+   def decide_continue(self):
+      # Decides game end condition
+      if self.score_left >= 11 or self.score_right >= 11:
+         self.continue_game = False
+
+   def step(self, input_source=None):
+      # Play one tick of the match, the same way Game.play does for every frame
+      # - input_source is asked for the paddle velocities before the update
+      if not self.continue_game:
+         return
+      if input_source is not None:
+         velocities = input_source.velocities(self)
+         if velocities is not None:
+            self.set_paddle_velocities(velocities[0], velocities[1])
+      self.update()
+      self.decide_continue()
+
+   def quiet_ticks(self, input_source=None):
+      # Return the number of ticks from now in which only the ball position changes, so
+      # they can be skipped by moving the ball in a straight line
+      # - input_source is the input source of the match, it must not be asked for new
+      #   velocities during the quiet ticks
+      if self.swept:
+         return 0
+      quiet = None
+      if input_source is not None:
+         if not hasattr(input_source, 'next_change'):
+            return 0
+         next_change = input_source.next_change(self)
+         if next_change is not None:
+            quiet = next_change - self.tick
+
+      # a paddle that is moving changes every tick, unless it is held against a wall
+      for paddle in (self.left_paddle, self.right_paddle):
+         if paddle.velocity < 0 and paddle.top > 0 \
+            or paddle.velocity > 0 and paddle.top + paddle.height < self.window_height:
+            return 0
+
+      # the ball must stay away from the walls, where it bounces and points are scored
+      radius = self.ball_radius
+      for position, velocity, size in zip(self.ball.center, self.ball.velocity, \
+                                          (self.window_width, self.window_height)):
+         if velocity > 0:
+            ticks = (size - radius - position) // velocity
+         elif velocity < 0:
+            ticks = (position - radius) // -velocity
+         else:
+            continue
+         if quiet is None or ticks < quiet:
+            quiet = ticks
+
+      # and its leading edge must stay out of the front of the paddle it moves towards
+      x, velocity_x = self.ball.center[0], self.ball.velocity[0]
+      if velocity_x < 0:
+         # the leading edge is inside the left paddle for the ticks j with
+         # left <= edge - j * speed < left + width
+         edge, speed, paddle = x - radius, -velocity_x, self.left_paddle
+         first = (edge - paddle.left - paddle.width) // speed + 1
+         last = (edge - paddle.left) // speed
+      elif velocity_x > 0:
+         # or inside the right paddle for the ticks j with
+         # left <= edge + j * speed < left + width
+         edge, speed, paddle = x + radius, velocity_x, self.right_paddle
+         first = -((edge - paddle.left) // speed)
+         last = -((edge - paddle.left - paddle.width) // speed) - 1
+      else:
+         first, last = 1, 0
+      first = max(first, 1)
+      if first <= last and (quiet is None or first - 1 < quiet):
+         quiet = first - 1
+      return max(quiet, 0) if quiet is not None else None
+
+   def fast_forward(self, input_source=None, ticks=None):
+      # Play the match like run, but jump straight over the ticks in which only the ball
+      # moves, stepping one tick at a time only around bounces, points and while a
+      # paddle is moving
+      # - returns the Match so runs can be chained
+      end = None if ticks is None else self.tick + ticks
+      while self.continue_game and (end is None or self.tick < end):
+         quiet = self.quiet_ticks(input_source)
+         if end is not None and (quiet is None or quiet > end - self.tick):
+            quiet = end - self.tick
+         if quiet is None:
+            # nothing will ever happen, which only a ball that does not move can do
+            break
+         if quiet > 0:
+            self.ball.center[0] += self.ball.velocity[0] * quiet
+            self.ball.center[1] += self.ball.velocity[1] * quiet
+            self.tick += quiet
+         if end is None or self.tick < end:
+            self.step(input_source)
+      return self
+
+   def run(self, input_source=None, ticks=None, viewer=None):
+      # Step the match until it is over, or for at most ticks updates
+      # - input_source gives the paddle velocities, None keeps the paddles still
+      # - viewer is shown the match after every tick, if it returns False the run stops
+      # - returns the Match so runs can be chained
+      played = 0
+      while self.continue_game and (ticks is None or played < ticks):
+         self.step(input_source)
+         played += 1
+         if viewer is not None and viewer.show(self) is False:
+            break
+      return self
+
+class Ball:
+   # An object in this class represents a Ball that that moves
+
+   __slots__ = ('radius', 'center', 'velocity')
+
+   def __init__(self, radius, center, velocity):
+      # Initialize the ball.
+      # - self is the Ball to initialize
+      # - radius is the int pixel radius of the Ball
+      # - center is a sequence containing the x and y int coords of the center of the Ball
+      # - velocity is a sequence containing the x and y components
+      # center and velocity are copied into lists owned by the Ball
+      self.radius = radius
+      self.center = [center[0], center[1]]
+      self.velocity = [velocity[0], velocity[1]]
+
+   def place(self, center, velocity):
+      # move the Ball to center with velocity, changing its own lists in place
+      self.center[0], self.center[1] = center
+      self.velocity[0], self.velocity[1] = velocity
+
+   def move(self, window_width, window_height):
+      # Change the location of the Ball by adding the corresponding
+      # speed values to the x and y coordinate of its center
+      # If it comes in contact with any of the four walls, reverse its direction of motion.
+      size = (window_width, window_height)
+      for index in range(0, 2):
+         self.center[index] = self.center[index] + self.velocity[index]
+         if self.center[index] < self.radius or self.center[index] > size[index] - self.radius:
+            self.velocity[index] = -self.velocity[index]
+
+   def collision_paddle(self, left_paddle, right_paddle):
+      # check if ball bounced on the front of each paddle, the ball goes through the back
+      # of the paddles
+      if left_paddle.collidepoint(self.center[0] - self.radius, self.center[1]) and self.velocity[0] < 0 \
+         or right_paddle.collidepoint(self.center[0] + self.radius, self.center[1]) and self.velocity[0] > 0:
+         self.velocity[0] = -self.velocity[0]
+
+   def next_impact(self, window_width, window_height, left_paddle, right_paddle):
+      # Find the first wall or paddle front the moving ball will touch
+      # - returns a (time, wall) tuple where time is in ticks and wall is one of 'top',
+      #   'bottom', 'left', 'right', 'left_paddle' or 'right_paddle', or None if the
+      #   ball is not moving
+      x, y = self.center
+      velocity_x, velocity_y = self.velocity
+      radius = self.radius
+      impact = None
+
+      # the top and bottom walls
+      if velocity_y < 0 and y >= radius:
+         impact = ((radius - y) / velocity_y, 'top')
+      elif velocity_y > 0 and y <= window_height - radius:
+         impact = ((window_height - radius - y) / velocity_y, 'bottom')
+
+      # the left and right walls, where the points are scored
+      if velocity_x < 0 and x >= radius:
+         wall = ((radius - x) / velocity_x, 'left')
+      elif velocity_x > 0 and x <= window_width - radius:
+         wall = ((window_width - radius - x) / velocity_x, 'right')
+      else:
+         wall = None
+      if wall is not None and (impact is None or wall[0] < impact[0]):
+         impact = wall
+
+      # the front of the paddle the ball is moving towards, the ball touches it when
+      # its leading edge reaches the face with its center level with the paddle
+      if velocity_x < 0:
+         paddle, face_x, name = left_paddle, left_paddle.left + left_paddle.width + radius, 'left_paddle'
+         in_front = x >= face_x
+      elif velocity_x > 0:
+         paddle, face_x, name = right_paddle, right_paddle.left - radius, 'right_paddle'
+         in_front = x <= face_x
+      else:
+         in_front = False
+      if in_front:
+         time = (face_x - x) / velocity_x
+         if (impact is None or time < impact[0]) \
+            and paddle.top <= y + velocity_y * time < paddle.top + paddle.height:
+            impact = (time, name)
+      return impact
+
+   def sweep(self, window_width, window_height, left_paddle, right_paddle, time_step=1, max_bounces=16):
+      # Move the Ball for time_step ticks, bouncing it at the exact time it touches a wall
+      # or the front of a paddle, any number of times up to max_bounces.
+      # - the paddles are taken as standing still for the time step
+      # - returns a (left, right) tuple with the number of times the ball touched the
+      #   left and right walls
+      left_goals, right_goals = 0, 0
+      remaining = time_step
+      for _ in range(max_bounces):
+         impact = self.next_impact(window_width, window_height, left_paddle, right_paddle)
+         if impact is None or impact[0] > remaining:
+            break
+         time, wall = impact
+         self.center[0] += self.velocity[0] * time
+         self.center[1] += self.velocity[1] * time
+         remaining -= time
+         if wall in ('top', 'bottom'):
+            self.velocity[1] = -self.velocity[1]
+         else:
+            self.velocity[0] = -self.velocity[0]
+            if wall == 'left':
+               left_goals += 1
+            elif wall == 'right':
+               right_goals += 1
+      self.center[0] += self.velocity[0] * remaining
+      self.center[1] += self.velocity[1] * remaining
+      return left_goals, right_goals
+
+class Paddle:
+   # An object in this class represents a paddle
+
+   __slots__ = ('left', 'top', 'width', 'height', 'velocity')
+
+   def __init__(self, left, top, width, height, velocity=0):
+      # Initialize the paddle
+      # - self is the paddle to initialize
+      # - left, top, width and height are the int bounds of the paddle, like a pygame.Rect
+      # - velocity is the int number of pixels the paddle moves down each tick
+      self.left = left
+      self.top = top
+      self.width = width
+      self.height = height
+      self.velocity = velocity
+
+   def move(self, window_height, time_step=1):
+      # move the paddle by its velocity and restrict it from moving off screen
+      # - time_step is the number of ticks to move for
+      self.top += self.velocity * time_step
+      if self.top <= 0:
+         self.top = 0
+      if self.top + self.height >= window_height:
+         self.top = window_height - self.height
+
+   def collidepoint(self, x, y):
+      # return True if the point is inside the paddle, with the same edges as pygame.Rect
+      return self.left <= x < self.left + self.width and self.top <= y < self.top + self.height
+
+   def rect(self):
+      # return the (left, top, width, height) bounds of the paddle
+      return (self.left, self.top, self.width, self.height)
+
+class HoldInput:
+   # An input source that holds both paddles at fixed velocities
+
+   __slots__ = ('left_velocity', 'right_velocity')
+
+   def __init__(self, left_velocity=0, right_velocity=0):
+      self.left_velocity = left_velocity
+      self.right_velocity = right_velocity
+
+   def velocities(self, match):
+      return (self.left_velocity, self.right_velocity)
+
+   def next_change(self, match):
+      return None
+
+class ScriptedInput:
+   # An input source that replays paddle velocity changes at given ticks
+
+   __slots__ = ('script', 'ticks')
+
+   def __init__(self, script):
+      # - script is a dict from tick to a (left, right) tuple of velocities, the
+      #   velocities are kept until the next tick in the script
+      self.script = script
+      self.ticks = sorted(script)
+
+   def velocities(self, match):
+      return self.script.get(match.tick)
+
+   def next_change(self, match):
+      # the first tick in the script that has not been played yet
+      index = bisect.bisect_left(self.ticks, match.tick)
+      return self.ticks[index] if index < len(self.ticks) else None
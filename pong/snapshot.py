@@ -0,0 +1,151 @@
+# Pong match snapshots
+#
+# A snapshot is the whole state of a pong.sim.Match packed into STATE.size bytes: the
+# tick, the ball center and velocity, the rect and velocity of both paddles, the scores
+# and continue_game. Positions and velocities are packed as doubles, so the snapshot
+# also holds the fractional positions of a swept Match, and come back as ints for a
+# Match that is not swept, so a restored match plays on exactly like the original.
+#
+# A RewindBuffer keeps the snapshots of the last seconds of a match in one bytearray
+# made up front. Recording a tick packs into the slot for that tick and restoring a tick
+# unpacks from it, so both take the same time however long the buffer is. That is
+# quick enough to seek back and forth interactively, and to branch many what-if
+# continuations from one moment of a match:
+#
+#    rewind = RewindBuffer(match, seconds=10)
+#    ...record every tick with rewind.record(match)...
+#    branch = rewind.match_at(match.tick - 120)
+#
+# save and load write one snapshot with the playfield settings to a file, to stop a
+# match and resume it later.
+
+import struct
+
+from pong.sim import Match
+
+STATE = struct.Struct('<q4didiididiidII?')
+SAVE_HEADER = struct.Struct('<4sBHHBd')
+SAVE_MAGIC = b'PSAV'
+SAVE_VERSION = 1
+
+# User-defined classes
+
+class RewindBuffer:
+   # An object in this class keeps the snapshots of the last ticks of a match
+
+   def __init__(self, match, seconds=10, tick_rate=60):
+      # Initialize a RewindBuffer.
+      # - match is the pong.sim.Match the snapshots are of, it gives the settings of the
+      #   matches made by match_at
+      # - seconds is how far back the buffer reaches at tick_rate ticks per second
+      # - capacity is the number of snapshots kept
+      self.capacity = max(1, int(seconds * tick_rate))
+      self.settings = settings(match)
+      self.data = bytearray(self.capacity * STATE.size)
+      self.ticks = [-1] * self.capacity
+      # the snapshots from first to newest were recorded one tick after another
+      self.first = None
+      self.newest = None
+
+   def record(self, match):
+      # pack the state of match into the slot for its tick
+      tick = match.tick
+      # recording the newest tick again, as happens right after a rewind, goes on from
+      # the snapshots before it, only a gap starts the history again
+      if self.newest is None or tick not in (self.newest, self.newest + 1):
+         self.first = tick
+      slot = tick % self.capacity
+      pack(match, self.data, slot * STATE.size)
+      self.ticks[slot] = tick
+      self.newest = tick
+
+   def oldest(self):
+      # return the earliest tick that can be restored, or None if nothing was recorded
+      if self.newest is None:
+         return None
+      return max(self.first, self.newest - self.capacity + 1)
+
+   def has(self, tick):
+      # return True if the snapshot of tick can be restored
+      return self.newest is not None and self.oldest() <= tick <= self.newest \
+             and self.ticks[tick % self.capacity] == tick
+
+   def restore(self, match, tick):
+      # Put match back in the state it had at tick
+      # - raises KeyError if the snapshot of tick is no longer in the buffer
+      if not self.has(tick):
+         raise KeyError('tick %d is not in the rewind buffer' % tick)
+      restore(match, self.data, (tick % self.capacity) * STATE.size)
+      return match
+
+   def rewind(self, match, ticks):
+      # Restore match to ticks ticks before its current tick, or as far back as the
+      # buffer goes, and return the tick it was restored to. The snapshots after that
+      # tick are dropped, so recording goes on from there
+      if self.newest is None:
+         return match.tick
+      tick = min(max(match.tick - ticks, self.oldest()), self.newest)
+      self.restore(match, tick)
+      # the slots before oldest now hold later ticks, so pin the start of the history
+      # before newest moves back, or oldest would reach into them
+      self.first = self.oldest()
+      self.newest = tick
+      return tick
+
+   def match_at(self, tick):
+      # return a new Match in the state the match had at tick
+      return self.restore(Match(**self.settings), tick)
+
+# User-defined functions
+
+def settings(match):
+   # return the dict of Match arguments needed to make a match that can hold the state of match
+   return {'window_width': match.window_width, 'window_height': match.window_height, \
+           'swept': match.swept, 'time_step': match.time_step}
+
+def pack(match, buffer=None, offset=0):
+   # Pack the state of match into buffer at offset, or return it as bytes if buffer is None
+   ball, left, right = match.ball, match.left_paddle, match.right_paddle
+   values = (match.tick, ball.center[0], ball.center[1], ball.velocity[0], ball.velocity[1], \
+             left.left, left.top, left.width, left.height, left.velocity, \
+             right.left, right.top, right.width, right.height, right.velocity, \
+             match.score_left, match.score_right, match.continue_game)
+   if buffer is None:
+      return STATE.pack(*values)
+   STATE.pack_into(buffer, offset, *values)
+
+def restore(match, buffer, offset=0):
+   # Put the state packed in buffer at offset into match and return match
+   (match.tick, x, y, velocity_x, velocity_y, left_left, left_top, left_width, left_height, \
+    left_velocity, right_left, right_top, right_width, right_height, right_velocity, \
+    match.score_left, match.score_right, match.continue_game) = STATE.unpack_from(buffer, offset)
+   if not match.swept:
+      # only a swept match moves by fractions of a pixel
+      x, y, velocity_x, velocity_y = int(x), int(y), int(velocity_x), int(velocity_y)
+      left_top, left_velocity = int(left_top), int(left_velocity)
+      right_top, right_velocity = int(right_top), int(right_velocity)
+   match.ball.place((x, y), (velocity_x, velocity_y))
+   for paddle, rect, velocity in ((match.left_paddle, (left_left, left_top, left_width, left_height), \
+                                   left_velocity), \
+                                  (match.right_paddle, (right_left, right_top, right_width, right_height), \
+                                   right_velocity)):
+      paddle.left, paddle.top, paddle.width, paddle.height = rect
+      paddle.velocity = velocity
+   return match
+
+def save(path, match):
+   # write the settings and state of match to the file at path
+   with open(path, 'wb') as file:
+      file.write(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, match.window_width, match.window_height, \
+                                  match.swept, match.time_step))
+      file.write(pack(match))
+
+def load(path):
+   # return a new Match with the settings and state saved in the file at path
+   with open(path, 'rb') as file:
+      data = file.read()
+   magic, version, window_width, window_height, swept, time_step = SAVE_HEADER.unpack_from(data)
+   if magic != SAVE_MAGIC or version != SAVE_VERSION:
+      raise ValueError('%s is not a Pong save file' % path)
+   match = Match(window_width, window_height, swept=bool(swept), time_step=time_step)
+   return restore(match, data, SAVE_HEADER.size)
@@ -0,0 +1,106 @@
+# Pong sprite cache
+#
+# The ball and the paddles look the same every frame, so instead of rasterizing a
+# circle and a rect with pygame.draw every frame they are drawn once into small
+# surfaces converted to the pixel format of the display, and the frames are made by
+# blitting those. Converting once matters as much as drawing once: a blit from a
+# surface in another format converts every pixel every time.
+#
+# Sprites are kept per (kind, size, color, antialias, skin) and are only drawn again
+# when one of those changes, or when the display changes format or size, which clears
+# the whole cache. A skin picks the colors and the look of the entities: the classic
+# skin draws exactly the pixels pong3.py always drew, the smooth skin antialiases the
+# ball and the retro skin has the square ball of the first Pong machines.
+
+import pygame
+import pygame.gfxdraw
+
+SKINS = {
+   'classic': {'ball': 'white', 'paddle': 'white', 'background': 'black', 'antialias': False, \
+               'shape': 'circle'},
+   'smooth': {'ball': 'white', 'paddle': 'white', 'background': 'black', 'antialias': True, \
+              'shape': 'circle'},
+   'retro': {'ball': 'white', 'paddle': 'white', 'background': 'black', 'antialias': False, \
+             'shape': 'square'},
+   'neon': {'ball': (255, 60, 200), 'paddle': (60, 220, 255), 'background': (10, 0, 30), \
+            'antialias': True, 'shape': 'circle'},
+}
+
+# User-defined classes
+
+class SpriteCache:
+   # An object in this class draws the sprites of the entities once and keeps them
+
+   def __init__(self, skin='classic'):
+      # Initialize a SpriteCache.
+      # - skin is the name of a skin in SKINS, or a dict with the same keys
+      # - builds counts the sprites drawn, so a cache that keeps rebuilding shows up
+      self.skin = SKINS[skin] if isinstance(skin, str) else skin
+      self.sprites = {}
+      self.display_format = None
+      self.builds = 0
+
+   def set_skin(self, skin):
+      # change the skin, the sprites of the new skin are drawn the next time they are used
+      self.skin = SKINS[skin] if isinstance(skin, str) else skin
+
+   def sync(self, surface):
+      # Clear the cache if surface, the surface the sprites are blitted to, changed its
+      # size or pixel format since the sprites were made
+      display_format = (surface.get_size(), surface.get_bitsize(), surface.get_masks())
+      if display_format != self.display_format:
+         self.display_format = display_format
+         self.sprites.clear()
+
+   def ball(self, radius, color=None):
+      # return the sprite of a ball of radius, its top left goes at the center - radius
+      color = pygame.Color(color if color is not None else self.skin['ball'])
+      key = ('ball', radius, tuple(color), self.skin['antialias'], self.skin['shape'])
+      sprite = self.sprites.get(key)
+      if sprite is None:
+         sprite = self.build_ball(radius, color)
+         self.sprites[key] = sprite
+      return sprite
+
+   def paddle(self, width, height, color=None):
+      # return the sprite of a paddle of width and height
+      color = pygame.Color(color if color is not None else self.skin['paddle'])
+      key = ('paddle', width, height, tuple(color))
+      sprite = self.sprites.get(key)
+      if sprite is None:
+         self.builds += 1
+         sprite = pygame.Surface((width, height))
+         sprite.fill(color)
+         sprite = convert(sprite)
+         self.sprites[key] = sprite
+      return sprite
+
+   def build_ball(self, radius, color):
+      # Draw a new ball sprite. A hard edged ball uses a colorkey, which SDL blits with
+      # run length encoding, an antialiased one needs per pixel alpha for its edge
+      self.builds += 1
+      size = 2 * radius
+      if self.skin['antialias'] and self.skin['shape'] == 'circle':
+         sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+         # the antialiased edge falls on the pixels inside the plain circle's bounds
+         pygame.gfxdraw.filled_circle(sprite, radius, radius, radius - 1, color)
+         pygame.gfxdraw.aacircle(sprite, radius, radius, radius - 1, color)
+         return convert(sprite, alpha=True)
+      sprite = pygame.Surface((size, size))
+      if self.skin['shape'] == 'square':
+         sprite.fill(color)
+         return convert(sprite)
+      key = (0, 0, 0) if tuple(color)[:3] != (0, 0, 0) else (255, 255, 255)
+      sprite.fill(key)
+      pygame.draw.circle(sprite, color, (radius, radius), radius)
+      sprite = convert(sprite)
+      sprite.set_colorkey(key, pygame.RLEACCEL)
+      return sprite
+
+# User-defined functions
+
+def convert(sprite, alpha=False):
+   # return sprite in the pixel format of the display, or as it is if there is no display
+   if pygame.display.get_surface() is None:
+      return sprite
+   return sprite.convert_alpha() if alpha else sprite.convert()
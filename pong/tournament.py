@@ -0,0 +1,214 @@
+# Pong bot tournaments
+#
+# Plays bots against each other in first to 11 matches and writes a standings table
+# with Elo ratings. The matches are played by pong.sim.Match.fast_forward in a pool of
+# worker processes, and every result is printed as soon as its match ends.
+#
+#    python -m pong.tournament intercept follow still --games 10
+#    python -m pong.tournament intercept follow still mybots:Bot --format swiss --rounds 5
+#
+# A bot is the name of one of the built in bots or module:Class for a class with the
+# velocity(match, paddle) and stale(match) methods of the bots in pong.ai. Every game
+# is served with a ball velocity picked from its seed, and the bots swap sides every
+# other game. A match that has not ended after max_ticks ticks is a draw. With an odd
+# number of bots in a swiss tournament, one bot sits out each round with a bye, which
+# counts as a win but does not change its Elo rating; every bot gets a bye before any
+# gets a second one.
+
+import argparse
+import concurrent.futures
+import importlib
+import random
+import sys
+
+from pong.ai import BotInput, FollowBot, InterceptBot, StillBot
+from pong.sim import Match
+
+BOTS = {
+   'intercept': InterceptBot,
+   'intercept3': lambda: InterceptBot(speed=3),
+   'follow': FollowBot,
+   'follow3': lambda: FollowBot(speed=3),
+   'still': StillBot,
+}
+
+# User-defined functions
+
+def make_bot(name):
+   # return a new bot from a built in name or a module:Class name
+   if name in BOTS:
+      return BOTS[name]()
+   module_name, _, class_name = name.partition(':')
+   if not class_name:
+      raise ValueError('unknown bot %r, use one of %s or module:Class' % (name, ', '.join(BOTS)))
+   return getattr(importlib.import_module(module_name), class_name)()
+
+def serve(seed):
+   # return the (x_velocity, y_velocity) of the ball the game with seed is served with
+   rng = random.Random(seed)
+   return rng.choice((-9, 9)), rng.choice((-4, -3, -2, 2, 3, 4))
+
+def play_game(game_id, left, right, seed, max_ticks):
+   # Play one match between the bots named left and right and return its result
+   # - seed picks the serve
+   # - returns a dict with the game id, bot names, scores and ticks played
+   x_velocity, y_velocity = serve(seed)
+   match = Match(x_velocity=x_velocity, y_velocity=y_velocity)
+   match.fast_forward(BotInput(make_bot(left), make_bot(right)), max_ticks)
+   return {'game': game_id, 'left': left, 'right': right, 'score_left': match.score_left, \
+           'score_right': match.score_right, 'ticks': match.tick, 'finished': not match.continue_game}
+
+def bye(game_id, bot):
+   # return the result of a round that bot sits out, which it wins
+   return {'game': game_id, 'left': bot, 'right': None, 'score_left': 0, 'score_right': 0, 'ticks': 0, \
+           'finished': True, 'bye': True}
+
+def winner(result):
+   # return the name of the winning bot of a result, or None for a draw
+   if result.get('bye'):
+      return result['left']
+   if not result['finished'] or result['score_left'] == result['score_right']:
+      return None
+   return result['left'] if result['score_left'] > result['score_right'] else result['right']
+
+def round_robin(bots, games):
+   # return the (left, right) pairs of a round robin where every two bots play games games
+   pairs = []
+   for first in range(len(bots)):
+      for second in range(first + 1, len(bots)):
+         for game in range(games):
+            pair = (bots[first], bots[second])
+            pairs.append(pair if game % 2 == 0 else pair[::-1])
+   return pairs
+
+def swiss_pairs(bots, standings, played, byes=()):
+   # Pair bots with the same number of points, avoiding rematches where possible
+   # - standings is a dict from bot to its points so far
+   # - played is a set of frozensets of bots that have already met
+   # - byes is the collection of bots that have already had a bye
+   # - returns the list of pairs and the bot with a bye, or None for an even number of bots
+   waiting = sorted(bots, key=lambda bot: -standings[bot])
+   sitting_out = None
+   if len(waiting) % 2:
+      # the lowest ranked bot that has not had a bye yet, or the lowest ranked one
+      sitting_out = next((bot for bot in reversed(waiting) if bot not in byes), waiting[-1])
+      waiting.remove(sitting_out)
+   pairs = []
+   while len(waiting) > 1:
+      first = waiting.pop(0)
+      opponent = next((bot for bot in waiting if frozenset((first, bot)) not in played), waiting[0])
+      waiting.remove(opponent)
+      pairs.append((first, opponent))
+   return pairs, sitting_out
+
+def play_all(executor, pairs, first_id, seed, max_ticks, report):
+   # play every (left, right) pair in the pool and return the results in game order,
+   # calling report with every result as soon as its match ends
+   futures = [executor.submit(play_game, first_id + index, left, right, seed + first_id + index, max_ticks) \
+              for index, (left, right) in enumerate(pairs)]
+   results = []
+   for future in concurrent.futures.as_completed(futures):
+      result = future.result()
+      report(result)
+      results.append(result)
+   return sorted(results, key=lambda result: result['game'])
+
+def elo(bots, results, k=16, start=1500):
+   # return a dict from bot to Elo rating after the results, in game order
+   ratings = {bot: float(start) for bot in bots}
+   for result in results:
+      if result.get('bye'):
+         continue
+      left, right = result['left'], result['right']
+      expected = 1 / (1 + 10 ** ((ratings[right] - ratings[left]) / 400))
+      best = winner(result)
+      actual = 0.5 if best is None else (1.0 if best == left else 0.0)
+      ratings[left] += k * (actual - expected)
+      ratings[right] -= k * (actual - expected)
+   return ratings
+
+def standings_table(bots, results):
+   # return the standings as lines of text, best Elo rating first
+   ratings = elo(bots, results)
+   rows = {bot: {'played': 0, 'won': 0, 'drawn': 0, 'lost': 0, 'for': 0, 'against': 0, 'byes': 0} \
+           for bot in bots}
+   for result in results:
+      best = winner(result)
+      if result.get('bye'):
+         rows[best]['won'] += 1
+         rows[best]['byes'] += 1
+         continue
+      for side, other in (('left', 'right'), ('right', 'left')):
+         row = rows[result[side]]
+         row['played'] += 1
+         row['for'] += result['score_' + side]
+         row['against'] += result['score_' + other]
+         if best is None:
+            row['drawn'] += 1
+         elif best == result[side]:
+            row['won'] += 1
+         else:
+            row['lost'] += 1
+   lines = ['%-4s %-20s %6s %5s %5s %5s %4s %6s %8s %7s' % ('rank', 'bot', 'played', 'won', 'drawn', \
+            'lost', 'byes', 'for', 'against', 'elo')]
+   for rank, bot in enumerate(sorted(bots, key=lambda bot: -ratings[bot]), 1):
+      row = rows[bot]
+      lines.append('%-4d %-20s %6d %5d %5d %5d %4d %6d %8d %7.1f' % (rank, bot, row['played'], row['won'], \
+                   row['drawn'], row['lost'], row['byes'], row['for'], row['against'], ratings[bot]))
+   return lines
+
+def main(argv=None):
+   # run a tournament from the command line
+   parser = argparse.ArgumentParser(description='Pong bot tournament')
+   parser.add_argument('bots', nargs='+', help='bots to play: %s or module:Class' % ', '.join(BOTS))
+   parser.add_argument('--format', choices=('round-robin', 'swiss'), default='round-robin')
+   parser.add_argument('--games', type=int, default=2, help='games per pair in a round robin')
+   parser.add_argument('--rounds', type=int, default=3, help='rounds of a swiss tournament')
+   parser.add_argument('--max-ticks', type=int, default=36000, help='ticks before a match is a draw')
+   parser.add_argument('--seed', type=int, default=0, help='seed for the serves')
+   parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+   parser.add_argument('--output', help='file to write the standings to, as well as printing them')
+   options = parser.parse_args(argv)
+   if len(set(options.bots)) != len(options.bots):
+      parser.error('every bot can only be entered once')
+   for bot in options.bots:
+      make_bot(bot)
+
+   def report(result):
+      if result.get('bye'):
+         print('game %d: %s has a bye' % (result['game'], result['left']), flush=True)
+         return
+      print('game %d: %s %d - %d %s%s' % (result['game'], result['left'], result['score_left'], \
+            result['score_right'], result['right'], '' if result['finished'] else ' (draw)'), flush=True)
+
+   results = []
+   with concurrent.futures.ProcessPoolExecutor(options.workers) as executor:
+      if options.format == 'round-robin':
+         results = play_all(executor, round_robin(options.bots, options.games), 0, options.seed, \
+                            options.max_ticks, report)
+      else:
+         played = set()
+         for _ in range(options.rounds):
+            points = {bot: 0.0 for bot in options.bots}
+            for result in results:
+               best = winner(result)
+               for side in ('left', 'right'):
+                  if result[side] is not None:
+                     points[result[side]] += 0.5 if best is None else float(best == result[side])
+            byes = {result['left'] for result in results if result.get('bye')}
+            pairs, sitting_out = swiss_pairs(options.bots, points, played, byes)
+            played.update(frozenset(pair) for pair in pairs)
+            results += play_all(executor, pairs, len(results), options.seed, options.max_ticks, report)
+            if sitting_out is not None:
+               results.append(bye(len(results), sitting_out))
+               report(results[-1])
+
+   lines = standings_table(options.bots, results)
+   print('\n'.join(lines))
+   if options.output:
+      with open(options.output, 'w') as file:
+         file.write('\n'.join(lines) + '\n')
+   return 0
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -16,8 +16,8 @@ import pygame
 # User-defined fucntions
 
 def main():
-   # initialize all pygame modules (some need initialization)
-   pygame.init()
+   # start the display, the only pygame module v1 needs
+   pygame.display.init()
    # create a pygame display window
    window_width = 500
    window_height = 400
@@ -175,4 +175,5 @@ class Paddle:
       # - self is the paddle    
       pygame.draw.rect(self.surface, self.paddle_color, self.rect_params)
 
-main()
+if __name__ == '__main__':
+   main()
@@ -13,12 +13,14 @@
 
 # imports the pygame module
 import pygame
+from pong.hud import Scoreboard
 
 # User-defined fucntions
 
 def main():
-   # initialize all pygame modules 
-   pygame.init()
+   # start the display and the font module for the scores, the only pygame modules v2 needs
+   pygame.display.init()
+   pygame.font.init()
    # create a pygame display window
    window_width = 500
    window_height = 400
@@ -54,6 +56,7 @@ class Game:
       self.game_Clock = pygame.time.Clock()
       self.close_clicked = False
       self.continue_game = True
+      self.scoreboard = Scoreboard(window_width) # caches the rendered score text
       
       # === game specific objects   
    
@@ -125,15 +128,9 @@ class Game:
       pygame.display.update() # make the updated surface appear on the display
       
    def draw_score(self):
-      # render scoreboards text to screen
-      text_color = pygame.Color('white')        
-      text_font = pygame.font.SysFont("", 72)      
-      left_scoreboard_position = (0, 0)      
-      left_scoreboard = text_font.render(str(self.score_left), True, text_color)
-      self.surface.blit(left_scoreboard , left_scoreboard_position)        
-      right_scoreboard = text_font.render(str(self.score_right), True, text_color)   
-      right_scoreboard_position = (self.window_width - right_scoreboard.get_width(), 0)
-      self.surface.blit(right_scoreboard, right_scoreboard_position)  
+      # render scoreboards text to screen, the scoreboard only renders a score again
+      # when it changes
+      self.scoreboard.draw(self.surface, self.score_left, self.score_right)
 
    def update(self):
       # Update the game objects for the next frame.
@@ -214,4 +211,5 @@ class Paddle:
       # - self is the paddle    
       pygame.draw.rect(self.surface, self.paddle_color, self.rect_params)
 
-main()
+if __name__ == '__main__':
+   main()